@@ -1,5 +1,8 @@
 """
 ASGI config for altruria_project project.
+
+Needed for long-lived responses such as the message stream (/api/messages/stream/):
+    gunicorn altruria_project.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 from decouple import config
 import pymysql
 
@@ -54,6 +55,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so their timings cover the rest of the stack (see core.middleware)
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestProfilingMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -86,9 +91,17 @@ TEMPLATES = [
 WSGI_APPLICATION = 'altruria_project.wsgi.application'
 
 # Database - MySQL configuration
+# Connection reuse is configured per deployment:
+# - DB_CONN_MAX_AGE: seconds a thread keeps its connection between requests
+#   (0 closes it after every request, which is the PythonAnywhere-safe default)
+# - DB_CONN_HEALTH_CHECKS: ping reused connections before handing them out
+# - DB_POOL_SIZE: when > 0, connections are returned to a bounded per-process pool
+#   shared by all threads (threaded gunicorn / ASGI), see core.db.backends.mysql_pool
+DB_POOL_SIZE = config('DB_POOL_SIZE', default=0, cast=int)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'core.db.backends.mysql_pool' if DB_POOL_SIZE else 'django.db.backends.mysql',
         'NAME': config('DB_NAME', default='altruria'),
         'USER': config('DB_USER', default='root'),
         'PASSWORD': config('DB_PASSWORD', default=''),
@@ -101,10 +114,41 @@ DATABASES = {
             'read_timeout': 30,
             'write_timeout': 30,
         },
-        'CONN_MAX_AGE': 0,  # Close connections after each request (PythonAnywhere safe)
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'POOL_SIZE': DB_POOL_SIZE,
+        'POOL_TIMEOUT': config('DB_POOL_TIMEOUT', default=30, cast=int),
+    }
+}
+
+# Cache - local memory by default. Point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) when running several
+# gunicorn workers so catalog invalidation reaches all of them.
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='altruria'),
     }
 }
 
+# Cache product list/detail responses. A process-local cache would keep serving
+# stale catalog pages in every worker but the one that saw the change, so this is
+# off by default unless the cache is shared (or DEBUG runs a single runserver process).
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CATALOG_CACHE_ENABLED = config(
+    'CATALOG_CACHE_ENABLED', default=DEBUG or CACHE_BACKEND not in PROCESS_LOCAL_CACHES, cast=bool
+)
+
+# Seconds a cached product list/detail response is kept
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# Maximum number of ranked matches a product search returns
+PRODUCT_SEARCH_MAX_RESULTS = config('PRODUCT_SEARCH_MAX_RESULTS', default=500, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -127,6 +171,65 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Formats generated for resized product images (core.images); 'avif' needs a Pillow build with AVIF support
+PRODUCT_IMAGE_FORMATS = config('PRODUCT_IMAGE_FORMATS', default='webp').split(',')
+
+# Background job queue (core.jobs, run with `manage.py run_worker`)
+JOBS_EAGER = config('JOBS_EAGER', default=False, cast=bool)  # run jobs inline instead of queueing them
+JOBS_CONCURRENCY = config('JOBS_CONCURRENCY', default=4, cast=int)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=5, cast=int)
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=10, cast=int)  # seconds, doubled on each retry
+JOBS_MAX_RETRY_DELAY = 3600
+JOBS_STALE_TIMEOUT = config('JOBS_STALE_TIMEOUT', default=600, cast=int)  # requeue running jobs whose worker sent no heartbeat for this long
+JOBS_RETENTION_DAYS = config('JOBS_RETENTION_DAYS', default=14, cast=int)  # done/failed jobs are deleted by `manage.py purge_jobs` after this
+
+# Pending orders paid up front are cancelled and their stock released after this many seconds (core.reservations)
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=900, cast=int)
+
+# Order submissions with an Idempotency-Key header are replayed to retries for this long (core.idempotency)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)  # seconds
+IDEMPOTENCY_WAIT_TIMEOUT = config('IDEMPOTENCY_WAIT_TIMEOUT', default=10, cast=int)  # seconds a duplicate waits for the first request
+
+# Product and order lists built from values() rows and rendered with orjson (core.renderers)
+FAST_SERIALIZATION = config('FAST_SERIALIZATION', default=True, cast=bool)
+
+# gzip/brotli response compression (core.compression); brotli needs the optional Brotli package
+COMPRESSION_ENABLED = config('COMPRESSION_ENABLED', default=True, cast=bool)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)  # bytes
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+# Responses holding credentials are never compressed (BREACH)
+COMPRESSION_EXCLUDE_PATHS = ['/api/auth/', '/api/token/']
+
+# Per-request query counts and Server-Timing headers (core.middleware)
+REQUEST_PROFILING = config('REQUEST_PROFILING', default=False, cast=bool)
+REQUEST_SLOW_THRESHOLD_MS = config('REQUEST_SLOW_THRESHOLD_MS', default=500, cast=int)
+REQUEST_DUPLICATE_QUERY_THRESHOLD = config('REQUEST_DUPLICATE_QUERY_THRESHOLD', default=3, cast=int)
+REQUEST_SLOW_LOG = config('REQUEST_SLOW_LOG', default='')  # file for slow request records; stderr when empty
+
+# Prometheus metrics at /metrics (core.metrics); scrapers send `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+        'profiling': (
+            {'class': 'logging.handlers.WatchedFileHandler', 'filename': REQUEST_SLOW_LOG, 'formatter': 'message'}
+            if REQUEST_SLOW_LOG else {'class': 'logging.StreamHandler', 'formatter': 'message'}
+        ),
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'INFO'},
+        'core.profiling': {'handlers': ['profiling'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -172,6 +275,10 @@ CORS_ALLOWED_ORIGINS = config(
 ).split(',')
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = [*default_headers, 'idempotency-key']
+
+# Diagnostic response headers readable by the frontend
+CORS_EXPOSE_HEADERS = ['X-Query-Count', 'Server-Timing', 'Idempotent-Replayed']
 
 # Custom User Model
 AUTH_USER_MODEL = 'core.User'
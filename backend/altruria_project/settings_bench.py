@@ -0,0 +1,38 @@
+"""
+Settings profile for `manage.py benchmark_api`.
+
+Runs the normal project settings against a throwaway in-memory SQLite database,
+so benchmarks need no MySQL server and never touch real data:
+
+    DJANGO_SETTINGS_MODULE=altruria_project.settings_bench python manage.py benchmark_api
+"""
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+SECURE_SSL_REDIRECT = False
+ALLOWED_HOSTS = ['testserver']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'altruria-bench',
+    }
+}
+# Benchmarks run in a single process, so the local cache is safe to use
+CATALOG_CACHE_ENABLED = True
+
+# Benchmarks send far more requests than the production rate limits allow
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+JOBS_EAGER = False
+
+# Only this profile lets benchmark_api create and drop data
+BENCHMARK_DATABASE = True
@@ -1,6 +1,15 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils.html import format_html
-from core.models import User, Product, Order, OrderItem, Message
+from core import reservations, rollups
+from core.exports import EXPORT_FORMATS, csv_lines, export_queryset, iter_orders, streaming_content
+from core.images import variants_are_current
+from core.models import (
+    User, Product, Order, OrderItem, Message, ConversationReadState, Job, SalesRollup, StockReservation,
+    IdempotencyKey,
+)
 
 
 @admin.register(User)
@@ -19,9 +28,10 @@ class UserAdmin(admin.ModelAdmin):
 
 def product_image_thumbnail(obj):
     if obj.image:
+        thumb = obj.image_variants.get('thumb', {}).get('webp') if variants_are_current(obj) else None
         return format_html(
             '<img src="{}" width="50" height="50" style="border-radius: 4px;"/>',
-            obj.image.url
+            obj.image.storage.url(thumb) if thumb else obj.image.url
         )
     return "No image"
 product_image_thumbnail.short_description = 'Thumbnail'
@@ -29,12 +39,12 @@ product_image_thumbnail.short_description = 'Thumbnail'
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'category', 'price', 'stock', product_image_thumbnail, 'created_at']
+    list_display = ['id', 'sku', 'name', 'category', 'price', 'stock', product_image_thumbnail, 'created_at']
     list_filter = ['category', 'created_at']
-    search_fields = ['name', 'description']
+    search_fields = ['sku', 'name', 'description']
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
-        ('Product Info', {'fields': ('name', 'category', 'price', 'stock')}),
+        ('Product Info', {'fields': ('sku', 'name', 'category', 'price', 'stock')}),
         ('Details', {'fields': ('description', 'image')}),
         ('Dates', {'fields': ('created_at', 'updated_at')}),
     )
@@ -47,13 +57,29 @@ class OrderItemInline(admin.TabularInline):
     can_delete = False
 
 
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def clean_status(self):
+        new_status = self.cleaned_data['status']
+        if self.instance.pk:
+            error = reservations.status_change_error(self.initial.get('status'), new_status)
+            if error:
+                raise forms.ValidationError(error)
+        return new_status
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = ['id', 'user_display', 'total', 'payment_method', 'status', 'delivery_method', 'created_at']
     list_filter = ['status', 'payment_method', 'delivery_method', 'created_at']
     search_fields = ['id', 'user__username', 'user__email']
     readonly_fields = ['id', 'created_at', 'updated_at']
     inlines = [OrderItemInline]
+    actions = ['export_csv']
     fieldsets = (
         ('Order Info', {'fields': ('id', 'user', 'status')}),
         ('Payment & Delivery', {'fields': ('payment_method', 'delivery_method', 'total')}),
@@ -65,15 +91,44 @@ class OrderAdmin(admin.ModelAdmin):
         return f"{obj.user.username} ({obj.user.email})"
     user_display.short_description = 'Customer'
 
+    @admin.action(description='Export selected orders as CSV')
+    def export_csv(self, request, queryset):
+        orders = iter_orders(export_queryset().filter(pk__in=queryset.values('pk')))
+        response = StreamingHttpResponse(
+            streaming_content(request, csv_lines(orders)), content_type=EXPORT_FORMATS['csv']
+        )
+        response['Content-Disposition'] = 'attachment; filename="orders.csv"'
+        return response
+
+    def save_model(self, request, obj, form, change):
+        """
+        Keep the sales rollups and stock reservations in step when status or
+        payment method is edited here, with the status rules of the API.
+        """
+        if not change or not {'status', 'payment_method'} & set(form.changed_data):
+            return super().save_model(request, obj, form, change)
+        with transaction.atomic():
+            # Locked so a concurrent status change can't slip in between the check and the save
+            previous = Order.objects.select_for_update().get(pk=obj.pk)
+            error = reservations.status_change_error(previous.status, obj.status)
+            if error:
+                self.message_user(request, f'Order {obj.pk} was not saved: {error}', level=messages.ERROR)
+                return
+            items = list(obj.items.select_related('product'))
+            rollups.remove_order(previous, items)
+            super().save_model(request, obj, form, change)
+            rollups.record_order(obj, items)
+            reservations.order_status_changed(obj, previous.status)
+
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user_display', 'sender', 'read', 'created_at', 'message_preview']
-    list_filter = ['sender', 'read', 'created_at']
+    list_display = ['id', 'user_display', 'sender', 'created_at', 'message_preview']
+    list_filter = ['sender', 'created_at']
     search_fields = ['user__username', 'user__email', 'text']
     readonly_fields = ['created_at']
     fieldsets = (
-        ('Message Info', {'fields': ('user', 'sender', 'read')}),
+        ('Message Info', {'fields': ('user', 'sender')}),
         ('Content', {'fields': ('text',)}),
         ('Date', {'fields': ('created_at',)}),
     )
@@ -85,3 +140,71 @@ class MessageAdmin(admin.ModelAdmin):
     def message_preview(self, obj):
         return obj.text[:50] + '...' if len(obj.text) > 50 else obj.text
     message_preview.short_description = 'Message'
+
+
+@admin.register(ConversationReadState)
+class ConversationReadStateAdmin(admin.ModelAdmin):
+    list_display = ['user', 'side', 'last_read_message_id', 'updated_at']
+    list_filter = ['side']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'updated_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'locked_by', 'last_error']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at']
+    fieldsets = (
+        ('Job', {'fields': ('name', 'payload', 'priority')}),
+        ('Scheduling', {'fields': ('status', 'run_at', 'attempts', 'max_attempts')}),
+        ('Worker', {'fields': ('locked_by', 'locked_at', 'last_error')}),
+        ('Dates', {'fields': ('created_at', 'updated_at')}),
+    )
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """Read-only: rows are maintained by core.reservations."""
+    list_display = ['id', 'order', 'product', 'quantity', 'status', 'expires_at', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['order__id', 'product__name', 'product__sku']
+    raw_id_fields = ['order', 'product']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    """Read-only: rows are written by core.idempotency."""
+    list_display = ['key', 'user', 'response_status', 'created_at', 'expires_at']
+    search_fields = ['key', 'user__username', 'user__email']
+    raw_id_fields = ['user']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    """Read-only: rows are maintained by core.rollups and `manage.py rebuild_sales_rollups`."""
+    list_display = ['day', 'category', 'payment_method', 'status', 'order_count', 'item_count', 'revenue']
+    list_filter = ['status', 'payment_method', 'category']
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,223 @@
+"""
+Response cache for the public product catalog.
+
+Entries are keyed on the catalog version plus the request path and the query
+parameters that change the response (CATALOG_CACHE_PARAMS); any other parameter
+is ignored so it can't be used to fill the cache with junk keys. Saving or deleting a Product bumps the version,
+so stale entries are never read again and simply expire. A per-key lock makes
+sure only one request recomputes a missing entry while the others wait for it.
+
+Stock changes from checkout are far more frequent, so they only stamp the
+products involved (invalidate_products). Each entry remembers which products
+it shows and when it was computed, and is recomputed on the next hit if one
+of them changed since; entries whose products aren't known (?fields= without
+id) are recomputed after any stock change.
+
+Entries also keep the rendered JSON body, precompressed for every encoding
+core.compression offers, so a cache hit for a plain JSON request is served as
+stored bytes without rendering or compressing anything.
+
+Invalidation only reaches other processes through a shared cache backend. With
+CATALOG_CACHE_ENABLED off (the default for process-local backends) responses
+are computed on every request and only the conditional GET support remains.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core.compression import negotiate, precompressed
+from core.metrics import CACHE_REQUESTS
+from core.renderers import FastJSONRenderer
+from core.models import Product
+
+CATALOG_VERSION_KEY = 'catalog:version'
+PRODUCT_CHANGED_KEY = 'catalog:changed:{}'
+ANY_PRODUCT_CHANGED_KEY = 'catalog:changed:any'
+LOCK_TIMEOUT = 10     # seconds a recomputation may hold the lock
+LOCK_WAIT = 5         # seconds a waiting request polls before computing itself
+LOCK_POLL_INTERVAL = 0.05
+# Query parameters that select the response: filter, search, ordering, pagination and fields
+CATALOG_CACHE_PARAMS = ('category', 'q', 'ordering', 'page', 'fields')
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_catalog():
+    """Make every cached catalog response stale."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_products(product_ids):
+    """Make cached catalog responses that show any of `product_ids` stale."""
+    now = time.time()
+    cache.set_many(
+        {**{PRODUCT_CHANGED_KEY.format(pid): now for pid in product_ids}, ANY_PRODUCT_CHANGED_KEY: now},
+        timeout=settings.CATALOG_CACHE_TIMEOUT,
+    )
+
+
+def _product_ids(data):
+    """Ids of the products in a catalog response, or None if some row has no id."""
+    rows = data.get('results', [data]) if isinstance(data, dict) else data
+    ids = [row.get('id') for row in rows]
+    return None if None in ids else ids
+
+
+def _is_current(entry):
+    """False if a product in `entry` had its stock changed after it was computed."""
+    products = entry.get('products')
+    keys = [ANY_PRODUCT_CHANGED_KEY] if products is None else [PRODUCT_CHANGED_KEY.format(pid) for pid in products]
+    if not keys:
+        return True
+    changed = cache.get_many(keys)
+    return not changed or max(changed.values()) < entry.get('computed_at', 0)
+
+
+def catalog_cache_key(request):
+    params = sorted((name, values) for name, values in request.query_params.lists() if name in CATALOG_CACHE_PARAMS)
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{params}'
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f'catalog:{catalog_version()}:{digest}'
+
+
+def catalog_validators(queryset=None):
+    """
+    ETag and Last-Modified for the catalog, derived from max(updated_at).
+    The row count is folded into the ETag so deletions also change it.
+    """
+    stats = (queryset if queryset is not None else Product.objects.all()).aggregate(
+        last_modified=Max('updated_at'), count=Count('id')
+    )
+    last_modified = stats['last_modified'].timestamp() if stats['last_modified'] else None
+    etag = quote_etag(hashlib.md5(f"{last_modified}:{stats['count']}".encode()).hexdigest())
+    return etag, last_modified
+
+
+def cached_catalog_response(request, compute, queryset=None):
+    """
+    Return the cached response for this catalog request, computing it with
+    compute() on a miss. Answers 304 Not Modified when the client's
+    If-None-Match / If-Modified-Since validators still match.
+    """
+    if not settings.CATALOG_CACHE_ENABLED:
+        return _uncached_response(request, compute, queryset)
+
+    key = catalog_cache_key(request)
+    entry = cache.get(key)
+    if entry is not None and not _is_current(entry):
+        cache.delete(key)
+        entry = None
+    CACHE_REQUESTS.labels('catalog', 'miss' if entry is None else 'hit').inc()
+    if entry is None:
+        entry = _compute_single_flight(key, compute, queryset)
+        if isinstance(entry, Response):
+            # Not cacheable (e.g. 404); hand it back untouched
+            return entry
+
+    not_modified = get_conditional_response(
+        request._request, etag=entry['etag'], last_modified=entry['last_modified']
+    )
+    if not_modified is not None:
+        response = Response(status=not_modified.status_code)
+    else:
+        response = _stored_response(request, entry) or Response(entry['data'], status=entry['status'])
+    response['ETag'] = entry['etag']
+    if response.has_header('Content-Encoding'):
+        response['ETag'] = 'W/' + entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+
+def _uncached_response(request, compute, queryset):
+    etag, last_modified = catalog_validators(queryset)
+    not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+    if not_modified is not None and last_modified is not None:
+        response = Response(status=not_modified.status_code)
+    else:
+        response = compute()
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+
+def _stored_response(request, entry):
+    """The stored body in the best encoding the client accepts, for plain JSON requests."""
+    bodies = entry.get('bodies')
+    if (
+        bodies is None
+        or not isinstance(request.accepted_renderer, JSONRenderer)
+        or request.accepted_media_type != JSONRenderer.media_type
+    ):
+        return None
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), [name for name in bodies if name])
+    response = HttpResponse(bodies[encoding], status=entry['status'], content_type=JSONRenderer.media_type)
+    if len(bodies) > 1:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def _compute_single_flight(key, compute, queryset):
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if time.monotonic() > deadline:
+            # The lock holder is stuck; stop waiting and compute without it
+            return _build_entry(key, compute, queryset)
+
+    try:
+        entry = cache.get(key)
+        if entry is None:
+            entry = _build_entry(key, compute, queryset)
+        return entry
+    finally:
+        cache.delete(lock_key)
+
+
+def _build_entry(key, compute, queryset):
+    # Taken before computing, so a stock change made meanwhile makes the entry stale
+    computed_at = time.time()
+    response = compute()
+    if response.status_code != 200:
+        return response
+
+    etag, last_modified = catalog_validators(queryset)
+    entry = {
+        'data': response.data,
+        'bodies': precompressed(FastJSONRenderer().render(response.data), JSONRenderer.media_type),
+        'status': response.status_code,
+        'etag': etag,
+        'last_modified': last_modified,
+        'products': _product_ids(response.data),
+        'computed_at': computed_at,
+    }
+    cache.set(key, entry, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return entry
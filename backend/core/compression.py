@@ -0,0 +1,121 @@
+"""
+Negotiated gzip/brotli response compression.
+
+CompressionMiddleware (core.middleware) compresses API responses of at least
+COMPRESSION_MIN_SIZE bytes on the fly; core.cache stores catalog responses
+already compressed so cache hits skip both rendering and compression.
+
+Brotli is offered when the `Brotli` package (in requirements.txt) is installed,
+otherwise only gzip. Gzip output carries Django's random padding against BREACH; brotli
+is only used for data responses (not HTML pages that may hold CSRF tokens).
+"""
+import re
+import secrets
+from gzip import GzipFile
+
+from django.conf import settings
+from django.utils.text import StreamingBuffer, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(r'^(text/|application/(json|javascript|xml|x-ndjson)|[^;]*\+(json|xml))')
+BROTLI_TYPES = re.compile(r'^(application/(json|x-ndjson)|text/csv)')
+GZIP_RANDOM_BYTES = 100
+
+
+def available_encodings(content_type=''):
+    """Encodings the server can produce for this content type, preferred first."""
+    if brotli is not None and BROTLI_TYPES.match(content_type):
+        return ['br', 'gzip']
+    return ['gzip']
+
+
+def negotiate(accept_encoding, encodings):
+    """The first of `encodings` the Accept-Encoding header allows (q > 0), or None."""
+    qualities = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        if name:
+            qualities[name.strip()] = quality
+    for encoding in encodings:
+        if qualities.get(encoding, qualities.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type):
+    return bool(COMPRESSIBLE_TYPES.match(content_type)) and not content_type.startswith('text/event-stream')
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(body, max_random_bytes=GZIP_RANDOM_BYTES)
+
+
+class StreamCompressor:
+    """Compresses one streamed body chunk by chunk, flushing after every chunk."""
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            return
+        self._brotli = None
+        self._buffer = StreamingBuffer()
+        # Random-length file name, like django.utils.text.compress_sequence, against BREACH
+        self._gzip = GzipFile(
+            b'a' * secrets.randbelow(GZIP_RANDOM_BYTES), mode='wb', compresslevel=6, fileobj=self._buffer, mtime=0
+        )
+
+    def process(self, chunk):
+        if self._brotli is not None:
+            return self._brotli.process(chunk)
+        self._gzip.write(chunk)
+        self._gzip.flush()
+        return self._buffer.read()
+
+    def finish(self):
+        if self._brotli is not None:
+            return self._brotli.finish()
+        self._gzip.close()
+        return self._buffer.read()
+
+
+def compress_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks, encoding):
+    """compress_stream() for the async iterators streamed under ASGI."""
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def precompressed(body, content_type):
+    """{encoding: bytes} for a payload that is served many times; None is the raw body."""
+    bodies = {None: body}
+    if settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MIN_SIZE and is_compressible(content_type):
+        for encoding in available_encodings(content_type):
+            compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                bodies[encoding] = compressed
+    return bodies
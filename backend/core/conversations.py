@@ -0,0 +1,66 @@
+"""
+Read state of support conversations.
+
+Each side ('user' = the customer, 'admin' = support staff) keeps a pointer to
+the last message it has read in a customer's conversation (ConversationReadState).
+A message is unread by a side when the other side sent it and its id is above
+that side's pointer; there is no per-message read flag.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.models import ConversationReadState, Message
+
+OTHER_SIDE = {'user': 'admin', 'admin': 'user'}
+
+
+def read_pointer(user_id, side):
+    return ConversationReadState.objects.filter(user_id=user_id, side=side).values_list(
+        'last_read_message_id', flat=True
+    ).first() or 0
+
+
+def mark_read(user_id, side, up_to_id=None):
+    """
+    Mark everything the other side sent in `user_id`'s conversation up to
+    `up_to_id` (default: the latest message) as read by `side`. `up_to_id` is
+    capped at the latest message, so the pointer never runs ahead of the
+    conversation. Pointers only move forward. Returns the resulting pointer.
+    """
+    latest = Message.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+    up_to_id = latest if up_to_id is None else max(0, min(up_to_id, latest))
+
+    if not ConversationReadState.objects.filter(
+        user_id=user_id, side=side, last_read_message_id__lt=up_to_id
+    ).update(last_read_message_id=up_to_id):
+        try:
+            with transaction.atomic():
+                ConversationReadState.objects.create(user_id=user_id, side=side, last_read_message_id=up_to_id)
+        except IntegrityError:
+            pass  # Already at or past up_to_id
+
+    return read_pointer(user_id, side)
+
+
+def unread_count(user_id, side, pointer=None):
+    if pointer is None:
+        pointer = read_pointer(user_id, side)
+    return Message.objects.filter(
+        user_id=user_id, sender=OTHER_SIDE[side], id__gt=pointer
+    ).count()
+
+
+def unread_filter(side):
+    """
+    Q() for aggregating unread messages per conversation in a query over
+    Message, e.g. Count('id', filter=unread_filter('admin')).
+    """
+    pointer = Coalesce(
+        Subquery(
+            ConversationReadState.objects.filter(user_id=OuterRef('user_id'), side=side)
+            .values('last_read_message_id')[:1]
+        ),
+        Value(0),
+    )
+    return Q(sender=OTHER_SIDE[side], id__gt=pointer)
@@ -0,0 +1,113 @@
+"""
+MySQL backend with a bounded per-process connection pool.
+
+Django opens one connection per thread and closes it when the request ends
+(CONN_MAX_AGE=0) or keeps it for that thread only. With threaded gunicorn
+workers or ASGI, this backend instead hands finished connections back to a
+pool shared by every thread of the process, so a connection (and its TCP/auth
+handshake) is reused across requests while the total stays capped.
+
+Enable it by setting DB_POOL_SIZE; extra settings_dict keys:
+    POOL_SIZE     maximum connections per process
+    POOL_TIMEOUT  seconds to wait for a free connection before failing
+"""
+import os
+import queue
+import threading
+
+from django.db import OperationalError
+from django.db.backends.mysql import base
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0  # connections actually opened, as opposed to reused from the pool
+
+    def acquire(self, connect, health_check):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Database connection pool exhausted ({self.size} connections in use)'
+            )
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = connect()
+                    self.opened += 1
+                    return conn
+                if not health_check or self._is_alive(conn):
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, reusable=True):
+        try:
+            if reusable:
+                try:
+                    conn.rollback()
+                except Exception:
+                    reusable = False
+            if reusable:
+                self._idle.put(conn)
+            else:
+                self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            conn.ping(False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_pool(alias, settings_dict):
+    # Keyed by pid so a pool created before a fork is never shared with children
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                size=settings_dict.get('POOL_SIZE') or 10,
+                timeout=settings_dict.get('POOL_TIMEOUT') or 30,
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            health_check=self.settings_dict['CONN_HEALTH_CHECKS'],
+        )
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # A connection closed mid-transaction or after errors isn't trusted again
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, reusable=reusable)
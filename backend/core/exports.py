@@ -0,0 +1,146 @@
+"""
+Streaming order exports (CSV or NDJSON) for accounting.
+
+Orders are read in keyset batches ordered by (created_at, id), each batch with
+its items prefetched, and serialized as they are read. MySQL drivers buffer the
+whole result set of a query even with QuerySet.iterator(), so bounded batches
+are what keeps memory flat; the cost per batch is one indexed range query plus
+one query for its items.
+
+Under ASGI, Django reads a sync streaming iterator to the end before sending
+anything, so `streaming_content` hands ASGI requests an async iterator that
+pulls the lines a chunk at a time in the sync thread instead.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from core.models import Order, OrderItem
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+EXPORT_BATCH_SIZE = 500
+STREAM_CHUNK_LINES = 200  # lines sent per thread hop when streaming under ASGI
+
+CSV_COLUMNS = [
+    'order_id', 'created_at', 'status', 'payment_method', 'delivery_method', 'customer_email',
+    'shipping_address', 'order_total', 'product_id', 'product_name', 'category', 'quantity',
+    'unit_price', 'line_total',
+]
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_queryset(start=None, end=None, statuses=None):
+    """Orders created between the `start` and `end` dates (inclusive) with one of `statuses`."""
+    orders = Order.objects.select_related('user').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('id'))
+    )
+    if start:
+        orders = orders.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        orders = orders.filter(created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+    if statuses:
+        orders = orders.filter(status__in=statuses)
+    return orders
+
+
+def iter_orders(queryset, batch_size=EXPORT_BATCH_SIZE):
+    """Yield every order in `queryset` oldest first, holding at most one batch in memory."""
+    queryset = queryset.order_by('created_at', 'id')
+    batch = list(queryset[:batch_size])
+    while batch:
+        yield from batch
+        last = batch[-1]
+        batch = list(queryset.filter(
+            Q(created_at__gt=last.created_at) | Q(created_at=last.created_at, id__gt=last.id)
+        )[:batch_size])
+
+
+class Echo:
+    """File-like object whose write() returns the value, so csv.writer produces strings to stream."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(orders):
+    """One CSV row per order item, after a header row."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for order in orders:
+        head = [
+            order.id, order.created_at.isoformat(), order.status, order.payment_method,
+            order.delivery_method, order.user.email, order.shipping_address, order.total,
+        ]
+        for item in order.items.all():
+            product = item.product
+            yield writer.writerow([_cell(value) for value in head + [
+                product.id if product else '', product.name if product else '',
+                product.category if product else '', item.quantity, item.price,
+                item.price * item.quantity,
+            ]])
+
+
+def ndjson_lines(orders):
+    """One JSON object per order, with its items nested."""
+    for order in orders:
+        yield json.dumps({
+            'id': order.id,
+            'created_at': order.created_at,
+            'status': order.status,
+            'payment_method': order.payment_method,
+            'delivery_method': order.delivery_method,
+            'customer_email': order.user.email,
+            'shipping_address': order.shipping_address,
+            'total': order.total,
+            'items': [
+                {
+                    'product_id': item.product_id,
+                    'product_name': item.product.name if item.product else None,
+                    'category': item.product.category if item.product else None,
+                    'quantity': item.quantity,
+                    'price': item.price,
+                }
+                for item in order.items.all()
+            ],
+        }, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(orders, export_format):
+    return csv_lines(orders) if export_format == 'csv' else ndjson_lines(orders)
+
+
+def _next_chunk(lines):
+    return ''.join(line for _, line in zip(range(STREAM_CHUNK_LINES), lines))
+
+
+async def _async_lines(lines):
+    while True:
+        # Thread-sensitive, so every batch query runs on the request's database connection
+        chunk = await sync_to_async(_next_chunk)(lines)
+        if not chunk:
+            return
+        yield chunk
+
+
+def streaming_content(request, lines):
+    """`lines` in the form StreamingHttpResponse can stream without buffering for this `request`."""
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return _async_lines(lines)
+    return lines
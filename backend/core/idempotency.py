@@ -0,0 +1,125 @@
+"""
+Idempotency keys for order submission.
+
+A client that retries POST /api/orders/ after a timeout sends the same
+`Idempotency-Key` header with every attempt. The first request with a key
+inserts an IdempotencyKey row before doing any work; its response is stored
+on the row and replayed as-is, with `Idempotent-Replayed: true`, to later
+requests with that key for IDEMPOTENCY_KEY_TTL seconds, without touching
+products or orders again. A duplicate that arrives while the first request is
+still running waits for it (polling, like the catalog cache lock) for up to
+IDEMPOTENCY_WAIT_TIMEOUT seconds and then replays its response.
+
+Keys are scoped to the user. Reusing a key with a different request body is
+rejected with 422. Error responses aren't stored: the key is freed so the
+client can retry with it once the problem is fixed.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+PROCESSING_TIMEOUT = 60  # seconds after which a key still without a response is treated as abandoned
+POLL_INTERVAL = 0.05
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """(row, created): the new row if this request now owns `key`, otherwise the existing one."""
+    now = timezone.now()
+    while True:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=user, key=key, fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                ), True
+        except IntegrityError:
+            pass
+        existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if existing is None:
+            continue  # Freed by a failed first request in the meantime
+        abandoned = (
+            existing.response_status is None
+            and existing.created_at <= now - timedelta(seconds=PROCESSING_TIMEOUT)
+        )
+        if existing.expires_at > now and not abandoned:
+            return existing, False
+        IdempotencyKey.objects.filter(pk=existing.pk).delete()
+
+
+def _replay(record):
+    return Response(record.response_body, status=record.response_status, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent_response(request, handler):
+    """
+    handler(request) guarded by the request's Idempotency-Key header, if it has
+    one. The caller must not hold a transaction open, so the key row is
+    visible to concurrent duplicates as soon as it is claimed.
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return handler(request)
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {'error': f'{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    fingerprint = request_fingerprint(request)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        record, created = _claim(request.user, key, fingerprint)
+        if created:
+            break
+        if record.fingerprint != fingerprint:
+            return Response(
+                {'error': f'{HEADER} was already used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        # Wait for the first request to store its response or give the key up
+        while record is not None and record.response_status is None and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:
+            continue
+        if record.response_status is not None:
+            return _replay(record)
+        return Response(
+            {'error': f'A request with this {HEADER} is still being processed, retry later'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    try:
+        response = handler(request)
+    except Exception:
+        IdempotencyKey.objects.filter(pk=record.pk).delete()
+        raise
+    if status.is_success(response.status_code):
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            response_status=response.status_code, response_body=response.data
+        )
+    else:
+        IdempotencyKey.objects.filter(pk=record.pk).delete()
+    return response
+
+
+def purge_expired():
+    """Delete keys past their TTL. Returns the number deleted."""
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
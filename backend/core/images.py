@@ -0,0 +1,119 @@
+"""
+Resized derivatives of product images.
+
+Every uploaded product image is re-encoded into a few bounded sizes (thumbnail,
+card and detail) so product grids don't download the full-size original. WebP
+is always produced; AVIF is added when listed in PRODUCT_IMAGE_FORMATS and the
+installed Pillow can encode it. The result is stored on Product.image_variants:
+
+    {'source': 'products/carrots.jpg',
+     'thumb': {'width': 160, 'height': 120, 'webp': 'products/derivatives/42-carrots-3f1c9a27be04-thumb.webp'},
+     ...}
+
+Derivative names carry the product id and a hash of the source image's
+content. Images that share a stem (carrots.jpg, carrots.png) never overwrite
+each other's variants, and products that share one source image (imports
+store identical files once) each own their derivatives, so deleting the
+derivatives of a replaced or removed image never touches another product's.
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Variant name -> longest edge in pixels
+DERIVATIVE_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'detail': 1024,
+}
+DERIVATIVES_DIR = 'products/derivatives'
+ENCODE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'avif': {'format': 'AVIF', 'quality': 60},
+}
+
+
+def enabled_formats():
+    return [
+        fmt for fmt in settings.PRODUCT_IMAGE_FORMATS
+        if fmt in ENCODE_OPTIONS and features.check(fmt)
+    ]
+
+
+def derivative_name(product_id, image_name, digest, variant, fmt):
+    """Storage name of one derivative; `digest` identifies the source image's content."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{DERIVATIVES_DIR}/{product_id}-{stem}-{digest}-{variant}.{fmt}'
+
+
+def derivative_files(variants):
+    """Storage names of every derivative in a Product.image_variants mapping."""
+    return {
+        name for variant, entry in variants.items() if variant != 'source'
+        for fmt, name in entry.items() if fmt in ENCODE_OPTIONS
+    }
+
+
+def delete_stale_derivatives(old_variants, new_variants, storage=None):
+    """Delete derivatives listed in `old_variants` that `new_variants` no longer uses."""
+    storage = storage or default_storage
+    for name in derivative_files(old_variants) - derivative_files(new_variants):
+        storage.delete(name)
+
+
+def generate_derivatives(product_id, image_name, storage=None):
+    """
+    Build every derivative of `image_name` for product `product_id` and return
+    the variants mapping to store on Product.image_variants. Safe to call from
+    a worker process.
+    """
+    storage = storage or default_storage
+    with storage.open(image_name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    original = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    original.load()
+
+    has_alpha = original.mode in ('RGBA', 'LA', 'PA') or 'transparency' in original.info
+    original = original.convert('RGBA' if has_alpha else 'RGB')
+
+    variants = {'source': image_name}
+    for variant, edge in DERIVATIVE_SIZES.items():
+        resized = original.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt in enabled_formats():
+            buffer = io.BytesIO()
+            resized.save(buffer, **ENCODE_OPTIONS[fmt])
+            name = derivative_name(product_id, image_name, digest, variant, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            entry[fmt] = storage.save(name, ContentFile(buffer.getvalue()))
+        variants[variant] = entry
+    return variants
+
+
+def variants_are_current(product):
+    return bool(product.image) and product.image_variants.get('source') == product.image.name
+
+
+def refresh_derivatives(product):
+    """
+    Regenerate derivatives for `product` if its image changed since the last
+    run, and delete the derivatives of the image it replaced.
+    """
+    if not product.image:
+        variants = {}
+    elif variants_are_current(product):
+        return
+    else:
+        variants = generate_derivatives(product.pk, product.image.name)
+    if variants != product.image_variants:
+        type(product).objects.filter(pk=product.pk).update(image_variants=variants)
+        delete_stale_derivatives(product.image_variants, variants)
+        product.image_variants = variants
@@ -0,0 +1,230 @@
+"""
+Bulk product import keyed on Product.sku, used by `manage.py import_products`.
+
+Rows are read one at a time from CSV, JSON Lines or a JSON array and handled in
+batches: each batch is one transaction with one SELECT for the existing SKUs,
+one bulk INSERT for new products and chunked bulk UPDATEs for changed ones. Only the
+columns present in a row are written, so a feed with just `sku,price,stock`
+updates prices and stock levels without touching anything else.
+
+Bulk writes skip Product signals, so the importer invalidates the catalog cache,
+queues image derivative jobs and marks the search index stale itself.
+"""
+import csv
+import hashlib
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import invalidate_catalog
+from core.jobs import enqueue_many
+from core.models import Product
+from core.search import bump_search_version
+
+IMPORT_FORMATS = ['csv', 'jsonl', 'json']
+IMPORT_FIELDS = ['name', 'category', 'price', 'description', 'stock', 'image']
+REQUIRED_FOR_CREATE = ['name', 'category', 'price']
+# bulk_update builds one CASE WHEN branch per row and column, so statements get
+# slower than linear with size; several smaller UPDATEs per batch are faster
+UPDATE_CHUNK_SIZE = 100
+IMPORTED_IMAGES_DIR = 'products'
+
+
+class RowError(ValueError):
+    pass
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'jsonl' if extension == 'ndjson' else extension
+
+
+def read_rows(file, file_format):
+    """Yield (line or position, row dict or RowError) without reading the whole file."""
+    if file_format == 'csv':
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            yield line, row
+    elif file_format == 'jsonl':
+        for line, text in enumerate(file, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as exc:
+                    yield line, RowError(f'Invalid JSON: {exc}')
+    else:
+        yield from enumerate(_iter_json_array(file), start=1)
+
+
+def _iter_json_array(file, chunk_size=65536):
+    """Decode the objects of a top-level JSON array one by one."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise RowError('JSON input must be an array of objects (use .jsonl for one object per line)')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            more = file.read(chunk_size)
+            if not more:
+                raise RowError('Unexpected end of JSON array')
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def clean_row(row):
+    """Validate a raw row; returns (sku, {field: value}) for the fields it provides."""
+    if isinstance(row, RowError):
+        raise row
+    if not isinstance(row, dict):
+        raise RowError('Row must be an object')
+
+    values = {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in row.items() if key in IMPORT_FIELDS + ['sku']
+    }
+    values = {key: value for key, value in values.items() if value not in ('', None)}
+    sku = str(values.pop('sku', '')).strip()
+    if not sku:
+        raise RowError('sku is required')
+    if len(sku) > Product._meta.get_field('sku').max_length:
+        raise RowError('sku is too long')
+
+    if 'name' in values:
+        values['name'] = str(values['name'])[:Product._meta.get_field('name').max_length]
+    if 'category' in values and values['category'] not in dict(Product.CATEGORY_CHOICES):
+        raise RowError(f'Invalid category {values["category"]!r}')
+    if 'price' in values:
+        try:
+            values['price'] = Decimal(str(values['price'])).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise RowError(f'Invalid price {values["price"]!r}')
+        if values['price'] < 0:
+            raise RowError('price must not be negative')
+    if 'stock' in values:
+        try:
+            values['stock'] = int(values['stock'])
+        except (TypeError, ValueError):
+            raise RowError(f'Invalid stock {values["stock"]!r}')
+        if values['stock'] < 0:
+            raise RowError('stock must not be negative')
+    return sku, values
+
+
+class ProductImporter:
+    """Upserts batches of cleaned rows and keeps running totals."""
+
+    def __init__(self, image_dir=None, dry_run=False, storage=None):
+        self.image_dir = image_dir
+        self.dry_run = dry_run
+        self.storage = storage or default_storage
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []
+        self._stored_images = {}
+
+    def record_error(self, line, message):
+        self.errors.append((line, message))
+
+    def import_batch(self, rows):
+        """Upsert [(line, sku, values)] in one transaction. Later rows for the same SKU win."""
+        latest = {}
+        for line, sku, values in rows:
+            if 'image' in values:
+                try:
+                    values['image'] = self.store_image(values['image'])
+                except RowError as exc:
+                    self.record_error(line, str(exc))
+                    continue
+            latest[sku] = (line, values)
+
+        with transaction.atomic():
+            existing = Product.objects.in_bulk(list(latest), field_name='sku')
+            now = timezone.now()
+            to_create, to_update, changed_fields, new_images = [], [], set(), []
+            for sku, (line, values) in latest.items():
+                product = existing.get(sku)
+                if product is None:
+                    missing = [field for field in REQUIRED_FOR_CREATE if field not in values]
+                    if missing:
+                        self.record_error(line, f'New SKU {sku} needs {", ".join(missing)}')
+                        continue
+                    to_create.append(Product(sku=sku, description=values.pop('description', ''), **values))
+                    if 'image' in values:
+                        new_images.append(sku)
+                    continue
+
+                changes = {
+                    field: value for field, value in values.items()
+                    if (product.image.name if field == 'image' else getattr(product, field)) != value
+                }
+                if not changes:
+                    self.unchanged += 1
+                    continue
+                for field, value in changes.items():
+                    setattr(product, field, value)
+                product.updated_at = now
+                to_update.append(product)
+                changed_fields.update(changes)
+                if 'image' in changes:
+                    new_images.append(sku)
+
+            Product.objects.bulk_create(to_create)
+            if to_update:
+                Product.objects.bulk_update(
+                    to_update, sorted(changed_fields | {'updated_at'}), batch_size=UPDATE_CHUNK_SIZE
+                )
+            self.created += len(to_create)
+            self.updated += len(to_update)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+            elif to_create or to_update:
+                # MySQL doesn't return ids from bulk INSERT, so look them up by SKU
+                image_ids = list(Product.objects.filter(sku__in=new_images).values_list('id', flat=True)) if new_images else []
+                transaction.on_commit(lambda: self._after_commit(image_ids))
+
+    def _after_commit(self, image_ids):
+        invalidate_catalog()
+        if image_ids:
+            enqueue_many('products.generate_image_derivatives', [{'product_id': pk} for pk in image_ids])
+
+    def finish(self):
+        """Mark the search index stale in every process once, after all batches."""
+        if not self.dry_run and (self.created or self.updated):
+            bump_search_version()
+
+    def store_image(self, source):
+        """
+        Copy a local image (relative to image_dir) into media storage under a
+        content-addressed name, so re-importing the same file stores it once
+        and leaves unchanged products untouched. Returns the storage name.
+        """
+        path = source if os.path.isabs(source) or not self.image_dir else os.path.join(self.image_dir, source)
+        if path in self._stored_images:
+            return self._stored_images[path]
+        if not os.path.isfile(path):
+            raise RowError(f'Image not found: {path}')
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as image:
+            for chunk in iter(lambda: image.read(65536), b''):
+                digest.update(chunk)
+        name = f'{IMPORTED_IMAGES_DIR}/{digest.hexdigest()[:12]}-{os.path.basename(path)}'
+        if not self.dry_run and not self.storage.exists(name):
+            with open(path, 'rb') as image:
+                name = self.storage.save(name, File(image))
+        self._stored_images[path] = name
+        return name
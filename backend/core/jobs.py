@@ -0,0 +1,154 @@
+"""
+Database-backed background job queue.
+
+Register a task with @job('name'), enqueue it with enqueue('name', **payload) and
+run `python manage.py run_worker` to drain the queue. Workers claim jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so several workers can share one queue
+without handing the same job out twice. Failed jobs are retried with
+exponential backoff until max_attempts is reached.
+
+A claimed job is leased to its worker: the worker refreshes locked_at (heartbeat)
+while the job runs, and only jobs whose lease has not been refreshed for
+JOBS_STALE_TIMEOUT are handed out again. Finished jobs are kept for
+JOBS_RETENTION_DAYS and then deleted by purge_finished().
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def job(name):
+    """Register the decorated function as the task called `name`."""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, priority=0, delay=None, max_attempts=None, **payload):
+    """
+    Queue task `name` with keyword arguments `payload` (must be JSON-serializable).
+    With JOBS_EAGER the task runs immediately instead, which is handy in development;
+    jobs with a `delay` are still queued, since running them early would defeat the delay.
+    """
+    if name not in registry:
+        raise KeyError(f'Unknown job: {name}')
+    if settings.JOBS_EAGER and not delay:
+        registry[name](**payload)
+        return None
+
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        priority=priority,
+        run_at=timezone.now() + (delay or timedelta()),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_many(name, payloads, priority=0):
+    """Queue one `name` job per payload dict with a single INSERT."""
+    if name not in registry:
+        raise KeyError(f'Unknown job: {name}')
+    if settings.JOBS_EAGER:
+        for payload in payloads:
+            registry[name](**payload)
+        return []
+
+    now = timezone.now()
+    return Job.objects.bulk_create([
+        Job(name=name, payload=payload, priority=priority, run_at=now, max_attempts=settings.JOBS_MAX_ATTEMPTS)
+        for payload in payloads
+    ])
+
+
+def claim(worker_id, limit=1):
+    """Claim up to `limit` due jobs for `worker_id`, highest priority first."""
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_at__lte=now)
+            .order_by('-priority', 'run_at', 'id')[:limit]
+        )
+        claimed = []
+        for candidate in candidates:
+            # The status guard keeps databases without row locks (SQLite) from double-claiming
+            if Job.objects.filter(pk=candidate.pk, status='queued').update(
+                status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+                updated_at=now,
+            ):
+                candidate.status = 'running'
+                candidate.locked_by = worker_id
+                candidate.attempts += 1
+                claimed.append(candidate)
+    return claimed
+
+
+def heartbeat(worker_id, job_ids):
+    """Renew the lease on jobs `worker_id` is still running, so requeue_stale() leaves them alone."""
+    return Job.objects.filter(pk__in=job_ids, status='running', locked_by=worker_id).update(
+        locked_at=timezone.now()
+    )
+
+
+def _finish(claimed, **fields):
+    """Record the outcome of `claimed`, unless its lease expired and it was handed out again."""
+    updated = Job.objects.filter(pk=claimed.pk, status='running', locked_by=claimed.locked_by).update(
+        locked_by='', locked_at=None, updated_at=timezone.now(), **fields
+    )
+    if not updated:
+        logger.warning('Job %s (%s) lost its lease before finishing; outcome not recorded', claimed.id, claimed.name)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1), settings.JOBS_MAX_RETRY_DELAY
+    ))
+
+
+def run(claimed):
+    """Execute a claimed job and record the outcome."""
+    func = registry.get(claimed.name)
+    try:
+        if func is None:
+            raise KeyError(f'Unknown job: {claimed.name}')
+        func(**claimed.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if claimed.attempts >= claimed.max_attempts:
+            logger.error('Job %s (%s) failed permanently:\n%s', claimed.id, claimed.name, error)
+            _finish(claimed, status='failed', last_error=error)
+        else:
+            logger.warning('Job %s (%s) failed, retrying:\n%s', claimed.id, claimed.name, error)
+            _finish(claimed, status='queued', last_error=error, run_at=timezone.now() + retry_delay(claimed.attempts))
+        return False
+
+    _finish(claimed, status='done')
+    return True
+
+
+def requeue_stale(timeout):
+    """Put back jobs whose worker stopped renewing their lease (it died or hung)."""
+    return Job.objects.filter(
+        status='running', locked_at__lt=timezone.now() - timeout
+    ).update(status='queued', locked_by='', locked_at=None, updated_at=timezone.now())
+
+
+def purge_finished(older_than):
+    """Delete done and failed jobs last updated more than `older_than` ago."""
+    deleted, _ = Job.objects.filter(
+        status__in=('done', 'failed'), updated_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
@@ -0,0 +1,226 @@
+import gc
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import Message, Order, Product, User
+
+# Cumulative table sizes; each size adds the rows missing from the previous one
+DATA_SIZES = {
+    'small': {'users': 200, 'products': 200, 'orders': 2000, 'messages': 1000},
+    'medium': {'users': 2000, 'products': 1000, 'orders': 20000, 'messages': 10000},
+    'large': {'users': 10000, 'products': 3000, 'orders': 100000, 'messages': 50000},
+}
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints at several data sizes and compare latency and query counts with a '
+        'baseline. The committed baseline stores latency with a wide --latency-tolerance so it holds on other '
+        'machines; save a local baseline (--save-baseline) to compare latency at --threshold/--p95-threshold.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small,medium',
+                            help=f'Comma-separated data sizes from: {", ".join(DATA_SIZES)}')
+        parser.add_argument('--iterations', type=int, default=30,
+                            help='Timed requests per endpoint and size')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Untimed requests before timing each endpoint')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help='Baseline JSON file to compare with')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write these results to the baseline file instead of comparing')
+        parser.add_argument('--queries-only', action='store_true',
+                            help='With --save-baseline, store only the query counts (portable across machines)')
+        parser.add_argument('--latency-tolerance', type=float,
+                            help='With --save-baseline, record this allowed relative p50/p95 increase in the '
+                                 'baseline; comparisons against it use it instead of --threshold/--p95-threshold')
+        parser.add_argument('--no-compare', action='store_true',
+                            help='Only report the results, without comparing them with a baseline')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative p50 latency increase over the baseline')
+        parser.add_argument('--p95-threshold', type=float, default=0.5,
+                            help='Allowed relative p95 latency increase over the baseline')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Latency increases smaller than this are treated as noise')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK_DATABASE', False):
+            raise CommandError(
+                'benchmark_api creates and modifies data; run it with '
+                'DJANGO_SETTINGS_MODULE=altruria_project.settings_bench'
+            )
+        sizes = [size for size in options['sizes'].split(',') if size]
+        unknown = [size for size in sizes if size not in DATA_SIZES]
+        if unknown:
+            raise CommandError(f'Unknown sizes: {", ".join(unknown)}')
+        sizes.sort(key=list(DATA_SIZES).index)
+
+        call_command('migrate', verbosity=0, interactive=False)
+        self.admin = User.objects.create_user(
+            username='bench-admin', email='bench-admin@example.com', password='bench', is_admin=True
+        )
+        self.buyer = User.objects.create_user(
+            username='bench-buyer', email='bench-buyer@example.com', password='bench'
+        )
+
+        results = {}
+        loaded = dict.fromkeys(DATA_SIZES['small'], 0)
+        for number, size in enumerate(sizes):
+            target = DATA_SIZES[size]
+            self.stdout.write(f'Loading {size} data set...')
+            call_command(
+                'generate_load_data', prefix=f'bench{number}', seed=number, stdout=io.StringIO(),
+                **{table: target[table] - loaded[table] for table in target},
+            )
+            loaded = dict(target)
+            results[size] = self._run_size(size, options)
+
+        report = {'iterations': options['iterations'], 'database': connection.vendor, 'results': results}
+        if options['output']:
+            self._write(Path(options['output']), report)
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            if options['queries_only']:
+                report['results'] = {
+                    size: {name: {'queries': case['queries']} for name, case in cases.items()}
+                    for size, cases in results.items()
+                }
+            elif options['latency_tolerance'] is not None:
+                report['latency_tolerance'] = options['latency_tolerance']
+            self._write(baseline_path, report)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+            return
+        if options['no_compare']:
+            return
+        if not baseline_path.exists():
+            raise CommandError(
+                f'No baseline at {baseline_path}; run with --save-baseline to create one, '
+                'or --no-compare to skip the comparison'
+            )
+
+        baseline = json.loads(baseline_path.read_text())
+        tolerance = baseline.get('latency_tolerance')
+        thresholds = (
+            (options['threshold'], options['p95_threshold']) if tolerance is None else (tolerance, tolerance)
+        )
+        regressions = self._compare(baseline['results'], results, thresholds, options)
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) against {baseline_path}: ' + ', '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+
+    def _cases(self):
+        """(name, user, method, path, body, clear cache first) for the endpoints under test."""
+        customer_id = Order.objects.values('user').annotate(n=Count('id')).order_by('-n', 'user')[0]['user']
+        talker_id = Message.objects.values('user').annotate(n=Count('id')).order_by('-n', 'user')[0]['user']
+        customer = User.objects.get(pk=customer_id)
+        talker = User.objects.get(pk=talker_id)
+
+        # Plenty of stock so repeated checkouts never run out
+        Product.objects.update(stock=10 ** 6)
+        basket = [
+            {'product_id': product_id, 'quantity': 1}
+            for product_id in Product.objects.order_by('id').values_list('id', flat=True)[:3]
+        ]
+        checkout = {
+            'payment_method': 'gcash', 'shipping_address': '1 Bench Street',
+            'delivery_method': 'delivery', 'items': basket,
+        }
+        return [
+            ('products.list', None, 'get', '/api/products/', None, True),
+            ('products.list.cached', None, 'get', '/api/products/', None, False),
+            ('products.category', None, 'get', '/api/products/?category=vegetables&ordering=-created_at', None, True),
+            ('products.search', None, 'get', '/api/products/?q=organic tomatoes', None, True),
+            ('cart.quote', self.buyer, 'post', '/api/cart/quote/', {'items': basket}, False),
+            ('orders.create', self.buyer, 'post', '/api/orders/', checkout, False),
+            ('orders.history', customer, 'get', '/api/users/orders/', None, False),
+            ('messages.user', talker, 'get', f'/api/messages/user/{talker.id}/', None, False),
+            ('messages.admin', self.admin, 'get', '/api/messages/admin/', None, False),
+            ('messages.inbox', self.admin, 'get', '/api/messages/admin/inbox/', None, False),
+            ('analytics.sales', self.admin, 'get', '/api/analytics/sales/?group_by=day,category', None, False),
+        ]
+
+    def _run_size(self, size, options):
+        results = {}
+        self.stdout.write(f'{size + " endpoint":<22} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8}')
+        for name, user, method, path, body, cold in self._cases():
+            client = APIClient()
+            if user:
+                client.force_authenticate(user=user)
+            # Collector pauses would land on random requests and dominate p95
+            gc.collect()
+            gc.disable()
+            try:
+                timings, query_counts = self._measure(name, client, method, path, body, cold, options)
+            finally:
+                gc.enable()
+
+            results[name] = {
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(self._percentile(timings, 95), 3),
+                'queries': max(query_counts),
+            }
+            row = results[name]
+            self.stdout.write(f'{name:<22} {row["p50_ms"]:>9.2f} {row["p95_ms"]:>9.2f} {row["queries"]:>8}')
+        return results
+
+    def _measure(self, name, client, method, path, body, cold, options):
+        """Milliseconds and query counts of the timed requests (warmup excluded)."""
+        timings, query_counts = [], []
+        for iteration in range(options['warmup'] + options['iterations']):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method)(path, body, format='json')
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(f'{name}: {method.upper()} {path} returned {response.status_code}')
+            if iteration >= options['warmup']:
+                timings.append(elapsed * 1000)
+                query_counts.append(len(queries))
+        return timings, query_counts
+
+    def _percentile(self, values, percent):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+    def _compare(self, baseline, results, thresholds, options):
+        regressions = []
+        for size, cases in results.items():
+            for name, current in cases.items():
+                previous = baseline.get(size, {}).get(name)
+                if previous is None:
+                    continue
+                problems = []
+                if current['queries'] > previous['queries']:
+                    problems.append(f'queries {previous["queries"]} -> {current["queries"]}')
+                for metric, threshold in zip(('p50_ms', 'p95_ms'), thresholds):
+                    if metric not in previous:
+                        continue  # Query-count-only baseline
+                    delta = current[metric] - previous[metric]
+                    if delta > options['min_delta_ms'] and current[metric] > previous[metric] * (1 + threshold):
+                        problems.append(f'{metric} {previous[metric]:.2f} -> {current[metric]:.2f}')
+                if problems:
+                    regressions.append(f'{size}/{name}')
+                    self.stdout.write(self.style.ERROR(f'  {size}/{name}: {"; ".join(problems)}'))
+        return regressions
+
+    def _write(self, path, report):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
@@ -0,0 +1,84 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+from core.models import Product
+
+POOL_ENGINE = 'core.db.backends.mysql_pool'
+
+
+class Command(BaseCommand):
+    help = 'Measure simulated requests/sec with database connection reuse off, on, and pooled (MySQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Simulated requests per mode')
+        parser.add_argument('--max-age', type=int, default=60,
+                            help='CONN_MAX_AGE used for the reuse run')
+        parser.add_argument('--pool-size', type=int, default=10,
+                            help='POOL_SIZE used for the pool run')
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        # The reuse runs measure Django's own connection handling, even when the pool is configured
+        engine = 'django.db.backends.mysql' if settings_dict['ENGINE'] == POOL_ENGINE else settings_dict['ENGINE']
+        modes = [
+            ('no reuse (CONN_MAX_AGE=0)', engine, {'CONN_MAX_AGE': 0}),
+            (f'reuse (CONN_MAX_AGE={options["max_age"]})', engine, {'CONN_MAX_AGE': options['max_age']}),
+        ]
+        if connection.vendor == 'mysql':
+            modes.append((f'pool (POOL_SIZE={options["pool_size"]})', POOL_ENGINE,
+                          {'CONN_MAX_AGE': 0, 'POOL_SIZE': options['pool_size']}))
+        else:
+            self.stdout.write(self.style.WARNING(f'The connection pool needs MySQL; skipping it on {connection.vendor}'))
+
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        original = connections[DEFAULT_DB_ALIAS]
+        original.close()
+        connection_created.connect(count)
+        results = []
+        try:
+            for label, mode_engine, overrides in modes:
+                wrapper = load_backend(mode_engine).DatabaseWrapper(
+                    {**settings_dict, **overrides, 'ENGINE': mode_engine}, DEFAULT_DB_ALIAS
+                )
+                pool = getattr(wrapper, 'pool', None)
+                pool_opened = pool.opened if pool else 0
+                connections[DEFAULT_DB_ALIAS] = wrapper
+                opened.clear()
+                try:
+                    elapsed = self._run(options['requests'])
+                finally:
+                    wrapper.close()
+                    connections[DEFAULT_DB_ALIAS] = original
+                # Every pool checkout fires connection_created, so count real connects instead
+                results.append((label, options['requests'] / elapsed,
+                                pool.opened - pool_opened if pool else len(opened)))
+        finally:
+            connection_created.disconnect(count)
+
+        self.stdout.write(f'{options["requests"]} requests per mode against {settings_dict["ENGINE"]}')
+        for label, rps, connections_opened in results:
+            self.stdout.write(f'  {label:<32} {rps:>9.1f} req/s  {connections_opened:>5} connections opened')
+        for label, rps, connections_opened in results[1:]:
+            if results[0][1]:
+                self.stdout.write(self.style.SUCCESS(f'Speedup with {label.split(" (")[0]}: {rps / results[0][1]:.2f}x'))
+
+    def _run(self, requests):
+        """Each iteration goes through the same request_started/request_finished
+        hooks as a real request, so CONN_MAX_AGE decides whether the connection survives
+        (and the pool backend gets it back when Django closes it)."""
+        start = time.perf_counter()
+        for _ in range(requests):
+            request_started.send(sender=self.__class__)
+            list(Product.objects.values_list('id', 'price')[:20])
+            request_finished.send(sender=self.__class__)
+        return time.perf_counter() - start
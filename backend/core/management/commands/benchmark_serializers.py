@@ -0,0 +1,123 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.images import DERIVATIVE_SIZES
+from core.models import Order, OrderItem, Product, User
+from core.renderers import FastJSONRenderer
+from core.serializers import (
+    OrderRowSerializer, OrderSerializer, ProductRowSerializer, ProductSerializer, order_columns, product_columns,
+)
+from core.views import order_queryset
+
+SKU_PREFIX = 'serbench-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare ModelSerializer + JSONRenderer with the values() row serializers + FastJSONRenderer '
+        'on product and order pages, and check both produce the same bytes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Products and orders per page')
+        parser.add_argument('--items', type=int, default=3, help='Items per order')
+        parser.add_argument('--iterations', type=int, default=10, help='Timed runs per path')
+
+    def handle(self, *args, **options):
+        # Fixture rows are created in a transaction that is rolled back at the end
+        with override_settings(ALLOWED_HOSTS=['testserver'], FAST_SERIALIZATION=True), transaction.atomic():
+            user = self._create_fixtures(options['rows'], options['items'])
+            request = APIRequestFactory().get('/api/products/')
+            products = Product.objects.filter(sku__startswith=SKU_PREFIX)
+            orders = Order.objects.filter(user=user)
+
+            cases = [
+                ('products', lambda: ProductSerializer(list(products), many=True, context={'request': request}).data,
+                 lambda: ProductRowSerializer(list(products.values(*product_columns())),
+                                              context={'request': request}).data),
+                ('orders', lambda: OrderSerializer(list(order_queryset().filter(user=user)), many=True).data,
+                 lambda: OrderRowSerializer(list(orders.values(*order_columns()))).data),
+            ]
+            self.stdout.write(f'{options["rows"]} rows per page, median of {options["iterations"]} runs')
+            self.stdout.write(f'{"page":<10} {"path":<9} {"fetch+serialize ms":>19} {"render ms":>10} {"total ms":>9}')
+            for name, standard, fast in cases:
+                baseline = self._measure(standard, JSONRenderer(), options['iterations'])
+                result = self._measure(fast, FastJSONRenderer(), options['iterations'])
+                self._check_identical(name, baseline['body'], result['body'])
+                for path, timings in (('standard', baseline), ('fast', result)):
+                    self.stdout.write(
+                        f'{name:<10} {path:<9} {timings["serialize"]:>19.2f} {timings["render"]:>10.2f} '
+                        f'{timings["serialize"] + timings["render"]:>9.2f}'
+                    )
+                speedup = (baseline['serialize'] + baseline['render']) / (result['serialize'] + result['render'])
+                self.stdout.write(self.style.SUCCESS(f'{name}: identical output, {speedup:.1f}x faster'))
+            transaction.set_rollback(True)
+
+    def _create_fixtures(self, rows, items_per_order):
+        user = User.objects.create_user(
+            username='serbench-customer', email='serbench-customer@example.com', password=None
+        )
+        products = []
+        for n in range(rows):
+            product = Product(
+                sku=f'{SKU_PREFIX}{n:06d}', name=f'Benchmark produce {n} – fresh', category='vegetables',
+                price=Decimal(n % 500) + Decimal('0.5'), description=f'Row {n} for the serializer benchmark',
+                stock=n % 50,
+            )
+            # Every other product has current derivatives, so image URLs are compared too
+            if n % 2:
+                product.image = f'products/serbench-{n}.jpg'
+                product.image_variants = {'source': product.image.name, **{
+                    variant: {'width': edge, 'height': edge * 3 // 4,
+                              'webp': f'products/derivatives/serbench-{n}-{variant}.webp'}
+                    for variant, edge in DERIVATIVE_SIZES.items()
+                }}
+            products.append(product)
+        Product.objects.bulk_create(products)
+        products = list(Product.objects.filter(sku__startswith=SKU_PREFIX))
+
+        orders = [
+            Order(id=f'SERBENCH-{n:06d}', user=user, total=Decimal('0.00'), payment_method='gcash',
+                  shipping_address=f'{n} Benchmark Street', delivery_method='delivery')
+            for n in range(rows)
+        ]
+        Order.objects.bulk_create(orders)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[(n + i) % len(products)], quantity=i + 1,
+                      price=products[(n + i) % len(products)].price)
+            for n, order in enumerate(orders) for i in range(items_per_order)
+        ])
+        return user
+
+    def _measure(self, serialize, renderer, iterations):
+        serialize_times, render_times = [], []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            data = serialize()
+            serialized = time.perf_counter()
+            body = renderer.render(data)
+            serialize_times.append((serialized - started) * 1000)
+            render_times.append((time.perf_counter() - serialized) * 1000)
+        return {
+            'serialize': statistics.median(serialize_times),
+            'render': statistics.median(render_times),
+            'body': body,
+        }
+
+    def _check_identical(self, name, expected, actual):
+        if expected == actual:
+            return
+        position = next(
+            (i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual))
+        )
+        raise CommandError(
+            f'{name}: fast output differs at byte {position}: '
+            f'{expected[max(0, position - 40):position + 40]!r} != {actual[max(0, position - 40):position + 40]!r}'
+        )
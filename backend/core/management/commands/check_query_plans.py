@@ -0,0 +1,162 @@
+import re
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from core.models import Message, Order, OrderItem, Product, StockReservation, User
+
+# (label, who is logged in, method, path, body, tables allowed to be read in full)
+# Paths are formatted with the ids of the fixture rows created in handle().
+# The full catalog list returns every product, and search without MySQL FULLTEXT
+# rebuilds the in-process index (core.search) from the whole table.
+ENDPOINTS = [
+    ('product list', None, 'get', '/api/products/', None, {'core_product'}),
+    ('product list by category', None, 'get', '/api/products/?category=meats', None, set()),
+    ('product list ordered', None, 'get', '/api/products/?category=meats&ordering=-created_at', None, set()),
+    ('product detail', None, 'get', '/api/products/{product}/', None, set()),
+    ('product search', None, 'get', '/api/products/?q=plancheck', None, {'core_product'}),
+    ('cart quote', 'customer', 'post', '/api/cart/quote/',
+     {'items': [{'product_id': '{product}', 'quantity': 1}]}, set()),
+    ('order create', 'customer', 'post', '/api/orders/',
+     {'items': [{'product_id': '{product}', 'quantity': 1}], 'payment_method': 'cod',
+      'shipping_address': 'Plan check', 'delivery_method': 'pickup'}, set()),
+    ('current user orders', 'customer', 'get', '/api/users/orders/', None, set()),
+    ('user orders', 'admin', 'get', '/api/orders/user/{customer}/', None, set()),
+    ('order detail', 'customer', 'get', '/api/orders/{order}/', None, set()),
+    ('order status update', 'admin', 'put', '/api/orders/{order}/status/', {'status': 'paid'}, set()),
+    ('order cancel', 'admin', 'put', '/api/orders/{order}/status/', {'status': 'cancelled'}, set()),
+    ('sales analytics', 'admin', 'get', '/api/analytics/sales/?group_by=category', None, set()),
+    ('user messages', 'customer', 'get', '/api/messages/user/{customer}/', None, set()),
+    ('admin unread messages', 'admin', 'get', '/api/messages/admin/', None, set()),
+    ('admin inbox', 'admin', 'get', '/api/messages/admin/inbox/', None, set()),
+    ('conversation read state', 'customer', 'get', '/api/messages/read/', None, set()),
+    ('mark conversation read', 'admin', 'post', '/api/messages/read/', {'user_id': '{customer}'}, set()),
+]
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every query issued by the main API endpoints and fail if any table is read with a full scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true',
+                            help='MySQL: also fail when the optimizer picked a full scan although an index was usable')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'mysql'):
+            raise CommandError(f'Plan checks are not implemented for {connection.vendor}')
+
+        failures = []
+        # Caching would hide the catalog queries and throttling would reject the
+        # burst of requests, so both run against a dummy cache here.
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            with transaction.atomic():
+                fixtures = self._create_fixtures()
+                for label, role, method, path, body, allowed in ENDPOINTS:
+                    failures += self._check(label, fixtures, role, method, path, body, allowed, options)
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{len(failures)} full table scan(s): ' + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'All {len(ENDPOINTS)} endpoints use indexed access paths'))
+
+    def _create_fixtures(self):
+        """Rows for the endpoints to find; they are rolled back when the check ends."""
+        customer = User.objects.create_user(
+            username='plancheck-customer', email='plancheck-customer@example.com', password=None
+        )
+        admin = User.objects.create_user(
+            username='plancheck-admin', email='plancheck-admin@example.com', password=None, is_admin=True
+        )
+        product = Product.objects.create(
+            name='Plancheck produce', category='meats', price=Decimal('10.00'),
+            description='Plancheck', stock=100,
+        )
+        order = Order.objects.create(
+            id='PLANCHECK-1', user=customer, total=Decimal('10.00'), payment_method='cod',
+            shipping_address='Plan check', delivery_method='pickup',
+        )
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        StockReservation.objects.create(order=order, product=product, quantity=1)
+        Message.objects.create(user=customer, sender='user', text='Plan check')
+        Message.objects.create(user=customer, sender='admin', text='Plan check reply')
+        return {
+            'users': {'customer': customer, 'admin': admin},
+            'ids': {'customer': customer.id, 'product': product.id, 'order': order.id},
+        }
+
+    def _check(self, label, fixtures, role, method, path, body, allowed, options):
+        ids = fixtures['ids']
+        client = APIClient()
+        if role:
+            client.force_authenticate(user=fixtures['users'][role])
+
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith('SELECT'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = getattr(client, method)(path.format(**ids), self._format_body(body, ids), format='json')
+        if response.status_code >= 400:
+            raise CommandError(f'{label}: {method.upper()} {path} returned {response.status_code}')
+
+        failures = []
+        for sql, params in queries:
+            plan = self._explain(sql, params)
+            scanned = self._full_scans(plan, options['strict']) - allowed
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  {sql}')
+                for row in plan:
+                    self.stdout.write(f'    {row}')
+            for table in sorted(scanned):
+                failures.append(f'{label} ({table})')
+                self.stdout.write(self.style.ERROR(f'  full scan of {table}: {sql}'))
+
+        if failures:
+            self.stdout.write(self.style.ERROR(f'FAIL {label}'))
+        else:
+            self.stdout.write(f'ok   {label} ({len(queries)} queries)')
+        return failures
+
+    def _format_body(self, body, ids):
+        if isinstance(body, dict):
+            return {key: self._format_body(value, ids) for key, value in body.items()}
+        if isinstance(body, list):
+            return [self._format_body(value, ids) for value in body]
+        if isinstance(body, str) and body.startswith('{'):
+            return body.format(**ids)
+        return body
+
+    def _explain(self, sql, params):
+        """Plan rows as dicts keyed by the EXPLAIN column names."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            columns = [column[0].lower() for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _full_scans(self, plan, strict):
+        """
+        Tables the plan reads row by row without an index.
+        SQLite reports these as `SCAN <table>` with no `USING ... INDEX`; MySQL as
+        access type ALL. On small tables MySQL may choose ALL even when an index
+        fits, so without --strict that only counts when no index was possible.
+        """
+        tables = set()
+        for row in plan:
+            if connection.vendor == 'sqlite':
+                match = SQLITE_SCAN.match(row['detail'])
+                if match and match.group(1) != 'CONSTANT':
+                    tables.add(match.group(1))
+            elif row.get('type') == 'ALL' and (strict or not row.get('possible_keys')):
+                tables.add(row['table'])
+        return tables
@@ -0,0 +1,39 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_lines, export_queryset, iter_orders
+from core.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Stream orders with their items as CSV or NDJSON (see core.exports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=list(EXPORT_FORMATS), default='csv',
+                            help='Export format')
+        parser.add_argument('--start', type=date.fromisoformat, help='First order date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last order date (YYYY-MM-DD)')
+        parser.add_argument('--status', action='append', choices=list(dict(Order.STATUS_CHOICES)),
+                            help='Only orders with this status (repeatable)')
+        parser.add_argument('--file', help='Write to this path instead of stdout')
+        parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE,
+                            help='Orders read per query')
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--start must not be after --end')
+
+        orders = iter_orders(
+            export_queryset(options['start'], options['end'], options['status']),
+            batch_size=options['batch_size'],
+        )
+        lines = export_lines(orders, options['output'])
+        if not options['file']:
+            sys.stdout.writelines(lines)
+            return
+
+        with open(options['file'], 'w', encoding='utf-8', newline='') as out:
+            out.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f'Exported orders to {options["file"]}'))
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.cache import invalidate_catalog
+from core.images import delete_stale_derivatives, generate_derivatives, variants_are_current
+from core.models import Product
+
+
+def _init_worker():
+    # Worker processes only touch storage, but need settings for it
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Backfill resized WebP derivatives for existing product images using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate derivatives even if they are up to date')
+
+    def handle(self, *args, **options):
+        products = [
+            product for product in Product.objects.exclude(image='').exclude(image__isnull=True)
+            if options['force'] or not variants_are_current(product)
+        ]
+        if not products:
+            self.stdout.write(self.style.SUCCESS('✓ All product images already have derivatives'))
+            return
+
+        self.stdout.write(f'Generating derivatives for {len(products)} images with {options["workers"]} workers...')
+
+        # Don't share the parent's database connections with forked workers
+        connections.close_all()
+
+        done, replaced = [], []
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            futures = {pool.submit(generate_derivatives, product.pk, product.image.name): product for product in products}
+            for future in as_completed(futures):
+                product = futures[future]
+                try:
+                    variants = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'✗ {product.image.name}: {e}'))
+                    continue
+                replaced.append((product.image_variants, variants))
+                product.image_variants = variants
+                done.append(product)
+
+        Product.objects.bulk_update(done, ['image_variants'], batch_size=500)
+        invalidate_catalog()
+        for old_variants, new_variants in replaced:
+            delete_stale_derivatives(old_variants, new_variants)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(done)} images processed'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'✗ {failed} images failed'))
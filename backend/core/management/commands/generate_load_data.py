@@ -0,0 +1,294 @@
+import random
+import time
+from bisect import bisect
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core import rollups
+from core.cache import invalidate_catalog
+from core.models import ConversationReadState, Message, Order, OrderItem, Product, User
+from core.search import bump_search_version
+
+PRODUCT_WORDS = {
+    'meats': (
+        ['Organic', 'Grass-Fed', 'Free-Range', 'Smoked', 'Marinated', 'Premium', 'Farm', 'Lean'],
+        ['Chicken Breast', 'Beef Ribeye', 'Pork Chops', 'Lamb Shoulder', 'Chicken Thighs',
+         'Ground Beef', 'Pork Belly', 'Beef Brisket', 'Duck Legs', 'Sausages', 'Bacon', 'Eggs'],
+    ),
+    'vegetables': (
+        ['Organic', 'Heirloom', 'Fresh', 'Baby', 'Seasonal', 'Local', 'Crisp', 'Sweet'],
+        ['Tomatoes', 'Carrots', 'Broccoli', 'Bell Peppers', 'Spinach', 'Lettuce', 'Kale',
+         'Potatoes', 'Onions', 'Cabbage', 'Squash', 'Eggplant', 'Cucumbers', 'Green Beans'],
+    ),
+}
+DESCRIPTION_SENTENCES = [
+    'Harvested this week from partner farms.',
+    'Perfect for grilling, roasting or stir-frying.',
+    'Packed fresh and delivered chilled.',
+    'No hormones, antibiotics or synthetic pesticides.',
+    'A family favourite for weekday dinners.',
+    'Rich in flavour and nutrients.',
+]
+MESSAGE_TEXTS = {
+    'user': [
+        'Hi, when will my order arrive?', 'Can I change my delivery address?',
+        'Is this product available in larger packs?', 'I was charged twice for my order.',
+        'Do you deliver on weekends?', 'Thank you, the produce was great!',
+    ],
+    'admin': [
+        'Your order is on its way and should arrive tomorrow.', 'We have updated your address.',
+        'Larger packs are available on request.', 'We have refunded the duplicate charge.',
+        'Yes, we deliver on Saturdays.', 'Thanks for the feedback!',
+    ],
+}
+# Items per order (1..10) weighted like a typical grocery basket
+ITEM_COUNT_WEIGHTS = [30, 24, 16, 10, 7, 5, 3, 2, 2, 1]
+PAYMENT_WEIGHTS = {'gcash': 45, 'cod': 35, 'bank': 20}
+RECENT_STATUS_WEIGHTS = {'pending': 40, 'paid': 30, 'shipped': 20, 'cancelled': 10}
+SETTLED_STATUS_WEIGHTS = {'completed': 88, 'cancelled': 7, 'shipped': 5}
+SETTLED_AFTER_DAYS = 14
+# Both sides have read everything older than this, and this share of the
+# conversations is read right up to the newest message
+READ_AFTER_DAYS = 2
+CAUGHT_UP_SHARE = 0.3
+
+
+@contextmanager
+def backdated(*models):
+    """Let bulk_create keep explicit created_at/updated_at values instead of stamping now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Bulk-insert a large, reproducible synthetic dataset (users, products, orders, messages) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--messages', type=int, default=50000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread orders and messages over this many days before --end-date')
+        parser.add_argument('--end-date', type=lambda value: datetime.fromisoformat(value).date(),
+                            help='Last day of generated activity (default: today)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed; the same seed and options produce the same data')
+        parser.add_argument('--prefix', default='load',
+                            help='Prefix for generated usernames, emails, SKUs and order ids')
+        parser.add_argument('--password', default='LoadTest123',
+                            help='Password for every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per INSERT and per transaction')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Load data with prefix {prefix!r} already exists; use another --prefix or a fresh database')
+        if options['orders'] and not (options['users'] and options['products']):
+            raise CommandError('Orders need at least one user and one product')
+        if options['messages'] and not options['users']:
+            raise CommandError('Messages need at least one user')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = max(1, options['batch_size'])
+        end_date = options['end_date'] or timezone.localdate()
+        self.end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        self.days = max(1, options['days'])
+        self.start = self.end - timedelta(days=self.days)
+
+        started = time.perf_counter()
+        user_ids = self._timed('users', lambda: self._users(options['users'], prefix, options['password']))
+        products = self._timed('products', lambda: self._products(options['products'], prefix))
+        self._timed('orders', lambda: self._orders(options['orders'], prefix, user_ids, products))
+        self._timed('messages', lambda: self._messages(options['messages'], user_ids))
+
+        if options['orders']:
+            self._timed('sales rollups', self._rebuild_rollups)
+        invalidate_catalog()
+        bump_search_version()
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s'))
+
+    def _timed(self, label, step):
+        self.rows_written = 0
+        started = time.perf_counter()
+        result = step()
+        elapsed = time.perf_counter() - started
+        rows = self.rows_written
+        self.stdout.write(f'  {label:<14} {rows:>10} rows in {elapsed:6.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)')
+        return result
+
+    def _rebuild_rollups(self):
+        self.rows_written += rollups.rebuild()
+
+    def _insert(self, model, objects):
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.rows_written += len(objects)
+
+    def _spread(self, total):
+        """Yield (day_start, count) for each day, with `total` spread randomly over the range."""
+        per_day = Counter(self.rng.randrange(self.days) for _ in range(total))
+        for day in range(self.days):
+            if per_day[day]:
+                yield self.start + timedelta(days=day), per_day[day]
+
+    def _sorted_times(self, day_start, count):
+        return sorted(day_start + timedelta(seconds=self.rng.randrange(86400)) for _ in range(count))
+
+    def _users(self, count, prefix, password):
+        hashed = make_password(password)
+        batch = []
+        with backdated(User):
+            for i in range(count):
+                joined = self.start + timedelta(seconds=self.rng.randrange(self.days * 86400))
+                batch.append(User(
+                    username=f'{prefix}-user-{i}', email=f'{prefix}-user-{i}@example.com', password=hashed,
+                    first_name=f'Customer {i}', address=f'{self.rng.randint(1, 999)} Farm Road',
+                    mobile=f'09{self.rng.randint(100000000, 999999999)}', created_at=joined, date_joined=joined,
+                ))
+                if len(batch) >= self.batch_size:
+                    self._insert(User, batch)
+                    batch = []
+            if batch:
+                self._insert(User, batch)
+        # MySQL doesn't return ids from bulk INSERT, so read them back
+        return list(User.objects.filter(username__startswith=f'{prefix}-user-').values_list('id', flat=True).order_by('id'))
+
+    def _products(self, count, prefix):
+        batch = []
+        with backdated(Product):
+            for i in range(count):
+                category = self.rng.choice(list(PRODUCT_WORDS))
+                adjectives, nouns = PRODUCT_WORDS[category]
+                added = self.start + timedelta(seconds=self.rng.randrange(self.days * 86400))
+                batch.append(Product(
+                    sku=f'{prefix}-{i:07d}',
+                    name=f'{self.rng.choice(adjectives)} {self.rng.choice(nouns)} #{i}',
+                    category=category,
+                    price=Decimal(round(self.rng.lognormvariate(5.2, 0.6), 2)).quantize(Decimal('0.01')),
+                    description=' '.join(self.rng.sample(DESCRIPTION_SENTENCES, 2)),
+                    stock=self.rng.randint(0, 500),
+                    created_at=added,
+                    updated_at=added,
+                ))
+                if len(batch) >= self.batch_size:
+                    self._insert(Product, batch)
+                    batch = []
+            if batch:
+                self._insert(Product, batch)
+        return list(Product.objects.filter(sku__startswith=f'{prefix}-').values_list('id', 'price').order_by('id'))
+
+    def _orders(self, count, prefix, user_ids, products):
+        if not count:
+            return
+        # A few customers and best-selling products account for most orders
+        user_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(user_ids))))
+        product_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(products))))
+        customers = self.rng.sample(user_ids, len(user_ids))
+        catalog = self.rng.sample(products, len(products))
+        item_counts = list(accumulate(ITEM_COUNT_WEIGHTS))
+        settled_before = self.end - timedelta(days=SETTLED_AFTER_DAYS)
+
+        orders, items = [], []
+        number = 0
+        with backdated(Order):
+            for day_start, day_count in self._spread(count):
+                for created in self._sorted_times(day_start, day_count):
+                    number += 1
+                    order_id = f'{prefix.upper()}-{created:%Y%m%d}-{number:08X}'
+                    lines = {}
+                    for _ in range(bisect(item_counts, self.rng.random() * item_counts[-1]) + 1):
+                        product_id, price = catalog[bisect(product_weights, self.rng.random() * product_weights[-1])]
+                        quantity = lines.get(product_id, (0, price))[0] + self.rng.choice((1, 1, 1, 2, 2, 3))
+                        lines[product_id] = (quantity, price)
+                    weights = SETTLED_STATUS_WEIGHTS if created < settled_before else RECENT_STATUS_WEIGHTS
+                    orders.append(Order(
+                        id=order_id,
+                        user_id=customers[bisect(user_weights, self.rng.random() * user_weights[-1])],
+                        total=sum((price * quantity for quantity, price in lines.values()), Decimal('0.00')),
+                        payment_method=self.rng.choices(list(PAYMENT_WEIGHTS), list(PAYMENT_WEIGHTS.values()))[0],
+                        status=self.rng.choices(list(weights), list(weights.values()))[0],
+                        shipping_address=f'{self.rng.randint(1, 999)} Farm Road',
+                        delivery_method=self.rng.choice(('delivery', 'delivery', 'pickup')),
+                        created_at=created,
+                        updated_at=created,
+                    ))
+                    items.extend(
+                        OrderItem(order_id=order_id, product_id=product_id, quantity=quantity, price=price)
+                        for product_id, (quantity, price) in lines.items()
+                    )
+                    if len(orders) >= self.batch_size:
+                        self._insert_orders(orders, items)
+                        orders, items = [], []
+            if orders:
+                self._insert_orders(orders, items)
+
+    def _insert_orders(self, orders, items):
+        with transaction.atomic():
+            Order.objects.bulk_create(orders, batch_size=self.batch_size)
+            OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+        self.rows_written += len(orders) + len(items)
+
+    def _messages(self, count, user_ids):
+        if not count:
+            return
+        # Roughly one customer in five talks to support
+        talkers = self.rng.sample(user_ids, max(1, len(user_ids) // 5))
+        batch = []
+        with backdated(Message):
+            # Inserted in time order so message ids increase with created_at,
+            # like real traffic (read pointers and streams rely on id order)
+            for day_start, day_count in self._spread(count):
+                for created in self._sorted_times(day_start, day_count):
+                    sender = 'user' if self.rng.random() < 0.55 else 'admin'
+                    batch.append(Message(
+                        user_id=self.rng.choice(talkers),
+                        sender=sender,
+                        text=self.rng.choice(MESSAGE_TEXTS[sender]),
+                        created_at=created,
+                    ))
+                    if len(batch) >= self.batch_size:
+                        self._insert(Message, batch)
+                        batch = []
+            if batch:
+                self._insert(Message, batch)
+        self._read_pointers(talkers)
+
+    def _read_pointers(self, talkers):
+        """One read pointer per side of every conversation (ids are only known once inserted)."""
+        messages = Message.objects.filter(user_id__in=talkers).order_by().values('user_id')
+        read_before = self.end - timedelta(days=READ_AFTER_DAYS)
+        older = dict(
+            messages.filter(created_at__lt=read_before).annotate(last=Max('id')).values_list('user_id', 'last')
+        )
+        newest = dict(messages.annotate(last=Max('id')).values_list('user_id', 'last'))
+        states = [
+            ConversationReadState(
+                user_id=user_id, side=side,
+                last_read_message_id=newest[user_id] if self.rng.random() < CAUGHT_UP_SHARE else older.get(user_id, 0),
+            )
+            for user_id in sorted(newest)
+            for side in ('user', 'admin')
+        ]
+        for start in range(0, len(states), self.batch_size):
+            self._insert(ConversationReadState, states[start:start + self.batch_size])
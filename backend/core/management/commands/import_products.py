@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import IMPORT_FORMATS, ProductImporter, RowError, clean_row, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Create or update products from a CSV, JSON Lines or JSON file, matched on sku (see core.imports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File with columns sku, name, category, price, description, stock, image')
+        parser.add_argument('--format', dest='file_format', choices=IMPORT_FORMATS,
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows written per transaction')
+        parser.add_argument('--image-dir', help='Directory that relative image paths are read from')
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help='Stop after this many invalid rows (earlier batches stay committed)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and count changes, then roll every batch back')
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or guess_format(options['path'])
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f'Unknown format {file_format!r}; pass --format {"|".join(IMPORT_FORMATS)}')
+        batch_size = max(1, options['batch_size'])
+
+        importer = ProductImporter(image_dir=options['image_dir'], dry_run=options['dry_run'])
+        start = time.perf_counter()
+        rows_read = 0
+        batch = []
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as source:
+                for line, row in read_rows(source, file_format):
+                    rows_read += 1
+                    try:
+                        batch.append((line, *clean_row(row)))
+                    except RowError as exc:
+                        importer.record_error(line, str(exc))
+                    if len(batch) >= batch_size:
+                        self._flush(importer, batch, rows_read, start, options)
+                        batch = []
+                    if len(importer.errors) > options['max_errors']:
+                        break
+                if batch and len(importer.errors) <= options['max_errors']:
+                    self._flush(importer, batch, rows_read, start, options)
+        except (OSError, RowError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            importer.finish()
+
+        elapsed = time.perf_counter() - start
+        for line, message in importer.errors[:20]:
+            self.stderr.write(f'  row {line}: {message}')
+        if len(importer.errors) > 20:
+            self.stderr.write(f'  ... and {len(importer.errors) - 20} more')
+
+        summary = (
+            f'{rows_read} rows in {elapsed:.2f}s ({rows_read / elapsed if elapsed else 0:.0f} rows/s): '
+            f'{importer.created} created, {importer.updated} updated, {importer.unchanged} unchanged, '
+            f'{len(importer.errors)} invalid'
+        )
+        if options['dry_run']:
+            summary += ' (dry run, nothing saved)'
+        if len(importer.errors) > options['max_errors']:
+            raise CommandError(f'Stopped after too many invalid rows. {summary}')
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def _flush(self, importer, batch, rows_read, start, options):
+        importer.import_batch(batch)
+        if options['verbosity'] >= 2:
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'  {rows_read} rows, {rows_read / elapsed:.0f} rows/s')
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Delete done and failed background jobs older than JOBS_RETENTION_DAYS (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.JOBS_RETENTION_DAYS,
+                            help='Keep jobs finished within this many days')
+
+    def handle(self, *args, **options):
+        deleted = jobs.purge_finished(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} finished job(s)'))
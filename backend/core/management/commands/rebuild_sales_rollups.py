@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollups from the order tables (see core.rollups)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare stored rollups with recomputed totals and fail on drift')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            return self._check()
+
+        start = time.perf_counter()
+        count = rollups.rebuild()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup rows in {elapsed:.2f}s'))
+
+    def _check(self):
+        expected = rollups.compute_rollups()
+        stored = rollups.stored_rollups()
+        zero = (0, 0, 0)
+        drifted = sorted(
+            key for key in expected.keys() | stored.keys()
+            if tuple(expected.get(key, zero)) != tuple(stored.get(key, zero))
+        )
+        for key in drifted:
+            day, category, payment_method, status = key
+            self.stdout.write(
+                f'  {day} {category or "(all)"} {payment_method} {status}: '
+                f'stored {stored.get(key, zero)}, expected {expected.get(key, zero)}'
+            )
+        if drifted:
+            raise CommandError(f'{len(drifted)} rollup rows differ from the order tables; run without --check to rebuild')
+        self.stdout.write(self.style.SUCCESS(f'{len(expected)} rollup rows match the order tables'))
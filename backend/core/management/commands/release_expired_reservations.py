@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import reservations
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancel pending orders whose stock reservations have expired and put their stock back on sale '
+        '(the worker does this per order; run this from cron as a safety net)'
+    )
+
+    def handle(self, *args, **options):
+        cancelled = reservations.expire()
+        self.stdout.write(self.style.SUCCESS(f'Cancelled {cancelled} expired order(s)'))
@@ -0,0 +1,120 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core import jobs
+
+# Leases are renewed this many times per JOBS_STALE_TIMEOUT, so a few missed
+# heartbeats (e.g. a slow database) don't get a running job requeued
+HEARTBEATS_PER_TIMEOUT = 4
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue (see core.jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+                            help='Number of jobs run at the same time (threads)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of waiting for new jobs')
+        parser.add_argument('--worker-id', default=f'{socket.gethostname()}:{os.getpid()}',
+                            help='Name recorded on claimed jobs')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_id = options['worker_id']
+        stale_timeout = timedelta(seconds=settings.JOBS_STALE_TIMEOUT)
+        stopping = threading.Event()
+        finished = threading.Event()
+        slots = threading.Semaphore(concurrency)
+        running = set()
+        running_lock = threading.Lock()
+
+        def stop(signum, frame):
+            self.stdout.write(self.style.WARNING('Stopping after running jobs finish...'))
+            stopping.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        def execute(claimed):
+            try:
+                ok = jobs.run(claimed)
+                style = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(style(f'{"✓" if ok else "✗"} Job {claimed.id} {claimed.name} (attempt {claimed.attempts})'))
+            finally:
+                with running_lock:
+                    running.discard(claimed.id)
+                connection.close()
+                slots.release()
+
+        def renew_leases():
+            # Runs until every job has finished, including while draining on shutdown
+            while not finished.wait(stale_timeout.total_seconds() / HEARTBEATS_PER_TIMEOUT):
+                with running_lock:
+                    job_ids = list(running)
+                if not job_ids:
+                    continue
+                try:
+                    close_old_connections()
+                    jobs.heartbeat(worker_id, job_ids)
+                except Exception as exc:
+                    self.stderr.write(f'Heartbeat failed: {exc}')
+            connection.close()
+
+        heartbeat = threading.Thread(target=renew_leases, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} started with concurrency {concurrency}'))
+        last_stale_check = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while not stopping.is_set():
+                close_old_connections()
+                if time.monotonic() - last_stale_check > stale_timeout.total_seconds() / 2:
+                    requeued = jobs.requeue_stale(stale_timeout)
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+                    last_stale_check = time.monotonic()
+
+                # Claim as many jobs as there are free slots
+                if not slots.acquire(timeout=options['poll_interval']):
+                    continue
+                free = 1
+                while free < concurrency and slots.acquire(blocking=False):
+                    free += 1
+
+                claimed = jobs.claim(worker_id, limit=free)
+                for _ in range(free - len(claimed)):
+                    slots.release()
+                with running_lock:
+                    running.update(item.id for item in claimed)
+                for item in claimed:
+                    pool.submit(execute, item)
+
+                if not claimed:
+                    if options['burst'] and self._idle(slots, concurrency):
+                        break
+                    stopping.wait(options['poll_interval'])
+
+        finished.set()
+        heartbeat.join()
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
+
+    def _idle(self, slots, concurrency):
+        """True when no job is running (all slots free)."""
+        taken = 0
+        while taken < concurrency and slots.acquire(blocking=False):
+            taken += 1
+        for _ in range(taken):
+            slots.release()
+        return taken == concurrency
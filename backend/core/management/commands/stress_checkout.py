@@ -0,0 +1,199 @@
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import reservations
+from core.models import Job, Order, OrderItem, Product, StockReservation, User
+
+PREFIX = 'stress-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Place orders for a few hot products from many threads at once, check that stock is never '
+        'oversold, then cancel and expire the orders and check all stock comes back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent checkout threads')
+        parser.add_argument('--checkouts', type=int, default=400, help='Checkout attempts across all threads')
+        parser.add_argument('--products', type=int, default=2, help='Hot products every checkout buys from')
+        parser.add_argument('--stock', type=int, default=100, help='Starting stock of each product')
+        parser.add_argument('--max-quantity', type=int, default=3, help='Largest quantity per order line')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('stress_checkout needs a database shared between threads, not in-memory SQLite')
+
+        # Every checkout comes from a handful of users, which the rate limits would reject
+        with override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}, ALLOWED_HOSTS=['testserver'],
+        ):
+            products, buyers, admin = self._create_fixtures(options)
+            try:
+                self._run(products, buyers, admin, options)
+            finally:
+                self._cleanup()
+
+    def _run(self, products, buyers, admin, options):
+        product_ids = [product.pk for product in products]
+        created = self._checkout(product_ids, buyers, options)
+        self._check_stock(product_ids, created, options['stock'])
+
+        # Cancel half through the status API, let the rest expire
+        cancel, expire = created[::2], created[1::2]
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        started = time.perf_counter()
+        for order_id in cancel:
+            response = client.put(f'/api/orders/{order_id}/status/', {'status': 'cancelled'}, format='json')
+            if response.status_code != 200:
+                raise CommandError(f'Cancelling {order_id} returned {response.status_code}')
+        cancelled_in = time.perf_counter() - started
+
+        started = time.perf_counter()
+        later = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL + 1)
+        expired = reservations.expire(order_ids=expire, now=later)
+        expired_in = time.perf_counter() - started
+        if expired != len(expire):
+            raise CommandError(f'Expected {len(expire)} orders to expire, {expired} did')
+
+        stock = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'stock'))
+        wrong = {pid: left for pid, left in stock.items() if left != options['stock']}
+        if wrong:
+            raise CommandError(f'Stock not fully released: {wrong}')
+        self.stdout.write(
+            f'Released: {len(cancel)} cancelled in {cancelled_in:.2f}s, {expired} expired in {expired_in:.2f}s; '
+            f'stock back to {options["stock"]} on every product'
+        )
+        self.stdout.write(self.style.SUCCESS('No oversell'))
+
+    def _create_fixtures(self, options):
+        self._cleanup()
+        products = [
+            Product.objects.create(
+                sku=f'{PREFIX}{n}', name=f'Flash sale item {n}', category='vegetables',
+                price=Decimal('99.00'), description='stress_checkout fixture', stock=options['stock'],
+            )
+            for n in range(options['products'])
+        ]
+        buyers = [
+            User.objects.create_user(
+                username=f'{PREFIX}buyer-{n}', email=f'{PREFIX}buyer-{n}@example.com', password=None
+            )
+            for n in range(options['threads'])
+        ]
+        admin = User.objects.create_user(
+            username=f'{PREFIX}admin', email=f'{PREFIX}admin@example.com', password=None, is_admin=True
+        )
+        return products, buyers, admin
+
+    def _checkout(self, product_ids, buyers, options):
+        attempts = iter(range(options['checkouts']))
+        lock = threading.Lock()
+        start = threading.Barrier(options['threads'])
+        outcomes, latencies = Counter(), []
+
+        def worker(number):
+            rng = random.Random(options['seed'] * 1000 + number)
+            client = APIClient()
+            client.force_authenticate(user=buyers[number])
+            try:
+                start.wait()
+                while True:
+                    with lock:
+                        if next(attempts, None) is None:
+                            return
+                    lines = [
+                        {'product_id': pid, 'quantity': rng.randint(1, options['max_quantity'])}
+                        for pid in rng.sample(product_ids, rng.randint(1, len(product_ids)))
+                    ]
+                    body = {'payment_method': 'gcash', 'shipping_address': '1 Stress Street',
+                            'delivery_method': 'pickup', 'items': lines}
+                    began = time.perf_counter()
+                    try:
+                        response = client.post('/api/orders/', body, format='json')
+                        outcome = response.status_code
+                    except Exception as exc:
+                        outcome, response = type(exc).__name__, None
+                    elapsed = time.perf_counter() - began
+                    with lock:
+                        outcomes[outcome] += 1
+                        if outcome == 201:
+                            latencies.append(elapsed * 1000)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(options['threads'])]
+        # Every sold-out checkout would log a 409 warning
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            request_logger.setLevel(level)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{options["checkouts"]} checkouts from {options["threads"]} threads for {len(product_ids)} products '
+            f'with {options["stock"]} stock each against {connection.vendor}'
+        )
+        self.stdout.write(
+            f'  {outcomes[201]} placed, {outcomes[409]} sold out, '
+            f'{sum(count for outcome, count in outcomes.items() if outcome not in (201, 409))} errors '
+            f'{dict((outcome, count) for outcome, count in outcomes.items() if outcome not in (201, 409)) or ""}'
+        )
+        self.stdout.write(
+            f'  {options["checkouts"] / elapsed:.1f} checkouts/s, {outcomes[201] / elapsed:.1f} orders/s'
+            + (f', placed p50 {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms' if latencies else '')
+        )
+        # Read back rather than trusting responses: an order can commit and its request still fail afterwards
+        return list(Order.objects.filter(user__in=buyers).values_list('pk', flat=True))
+
+    def _check_stock(self, product_ids, created, initial):
+        """Stock left + quantities ordered must equal the starting stock, and never go negative."""
+        stock = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'stock'))
+        ordered = dict(
+            OrderItem.objects.filter(order_id__in=created).values_list('product_id').annotate(total=Sum('quantity'))
+        )
+        held = dict(
+            StockReservation.objects.filter(order_id__in=created, status='held')
+            .values_list('product_id').annotate(total=Sum('quantity'))
+        )
+        for pid in product_ids:
+            sold = ordered.get(pid, 0)
+            self.stdout.write(f'  product {pid}: {sold} sold, {stock[pid]} left')
+            if stock[pid] < 0 or sold + stock[pid] != initial or held.get(pid, 0) != sold:
+                raise CommandError(
+                    f'Product {pid} oversold or out of step: started with {initial}, {sold} ordered, '
+                    f'{held.get(pid, 0)} reserved, {stock[pid]} left'
+                )
+
+    def _cleanup(self):
+        orders = Order.objects.filter(user__username__startswith=PREFIX)
+        Job.objects.filter(
+            name='orders.expire_reservations', payload__order_id__in=list(orders.values_list('pk', flat=True))
+        ).delete()
+        # Deleted through the ORM so the pre_delete signals take them out of the sales rollups
+        orders.delete()
+        Product.objects.filter(sku__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
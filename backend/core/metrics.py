@@ -0,0 +1,84 @@
+"""
+Prometheus metrics served at /metrics.
+
+Under gunicorn every worker is a separate process with its own counters, so
+gunicorn.conf.py points PROMETHEUS_MULTIPROC_DIR at a shared directory before
+the app is imported. prometheus_client then keeps each worker's values in
+memory-mapped files there, and the /metrics view adds them up across workers.
+Without that variable (runserver, manage.py commands) the metrics simply live in
+the current process.
+
+Label values come from URL patterns and model choices, never from raw request
+data, so the number of time series stays bounded.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+from core.models import Order
+
+REQUEST_LATENCY = Histogram(
+    'altruria_http_request_duration_seconds',
+    'Time spent handling a request, by view and response status',
+    ['method', 'view', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'altruria_http_request_db_queries',
+    'SQL queries run while handling a request, by view',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+CACHE_REQUESTS = Counter(
+    'altruria_cache_requests_total',
+    'Response cache lookups, by cache and result (hit or miss)',
+    ['cache', 'result'],
+)
+THROTTLED_REQUESTS = Counter(
+    'altruria_throttled_requests_total',
+    'Requests rejected with 429 Too Many Requests, by view',
+    ['view'],
+)
+ORDERS_CREATED = Counter(
+    'altruria_orders_created_total',
+    'Orders placed through the API, by payment method',
+    ['payment_method'],
+)
+ORDER_REVENUE = Counter(
+    'altruria_order_revenue_total',
+    'Total value of orders placed through the API, by payment method',
+    ['payment_method'],
+)
+
+PAYMENT_METHODS = {value for value, _ in Order.PAYMENT_CHOICES}
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def method_label(request):
+    return request.method if request.method in HTTP_METHODS else 'other'
+
+
+def view_label(request):
+    """The URL pattern name of the matched view, e.g. 'product-list'."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unnamed'
+
+
+def record_order(order):
+    method = order.payment_method if order.payment_method in PAYMENT_METHODS else 'other'
+    ORDERS_CREATED.labels(method).inc()
+    ORDER_REVENUE.labels(method).inc(float(order.total))
+
+
+def render_latest():
+    """(body, content type) of the current metrics, merged across workers when multiprocess."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,249 @@
+"""
+Per-request SQL and timing instrumentation, and response compression.
+
+MetricsMiddleware (enabled with METRICS_ENABLED) feeds the Prometheus request
+latency, query count and throttling metrics in core.metrics.
+
+RequestProfilingMiddleware (enabled with REQUEST_PROFILING) times every query
+on the default database, adds a Server-Timing header with the phases of the
+request and writes JSON lines to the `core.profiling` logger:
+
+- `slow_request` when a request takes REQUEST_SLOW_THRESHOLD_MS or longer,
+  with its slowest statements;
+- `duplicate_queries` when the same SQL runs REQUEST_DUPLICATE_QUERY_THRESHOLD
+  or more times in one request, which is how an N+1 query pattern shows up.
+
+SQL is logged without its parameters, which can contain personal data.
+
+CompressionMiddleware (enabled with COMPRESSION_ENABLED) gzip/brotli-encodes
+responses, see core.compression.
+
+All of them support sync and async requests, so the message stream keeps running as
+an async view under ASGI. Queries made while a streaming response is iterated
+happen after the middleware returns and are not counted.
+"""
+import json
+import logging
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import compression, metrics
+
+logger = logging.getLogger('core.profiling')
+
+SLOWEST_QUERIES_LOGGED = 5
+
+
+class QueryCounter:
+    """connection.execute_wrapper() hook counting statements."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryCollector:
+    """connection.execute_wrapper() hook recording each statement's SQL and duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, threshold):
+        counts = Counter(sql for sql, _ in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+    def slowest(self, limit):
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:limit]
+
+
+class InstrumentationMiddleware:
+    """
+    Runs the rest of the stack with `collector_class` installed as an execute
+    wrapper, then hands the response to finish(). Disabled (MiddlewareNotUsed)
+    when the `enabled_setting` setting is false.
+    """
+    sync_capable = True
+    async_capable = True
+    enabled_setting = None
+    collector_class = QueryCounter
+
+    def __init__(self, get_response):
+        if not getattr(settings, self.enabled_setting):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.start(request)
+        collector = self.collector_class()
+        started = time.perf_counter()
+        with connection.execute_wrapper(collector):
+            response = self.get_response(request)
+        return self.finish(request, response, collector, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        self.start(request)
+        collector = self.collector_class()
+        started = time.perf_counter()
+        with connection.execute_wrapper(collector):
+            response = await self.get_response(request)
+        return self.finish(request, response, collector, time.perf_counter() - started)
+
+    def start(self, request):
+        pass
+
+    def finish(self, request, response, collector, elapsed):
+        return response
+
+
+class MetricsMiddleware(InstrumentationMiddleware):
+    """Observes every request in the Prometheus metrics, labelled by URL pattern name."""
+    enabled_setting = 'METRICS_ENABLED'
+
+    def finish(self, request, response, collector, elapsed):
+        view = metrics.view_label(request)
+        metrics.REQUEST_LATENCY.labels(metrics.method_label(request), view, response.status_code).observe(elapsed)
+        metrics.REQUEST_QUERIES.labels(view).observe(collector.count)
+        if response.status_code == 429:
+            metrics.THROTTLED_REQUESTS.labels(view).inc()
+        return response
+
+
+class RequestProfilingMiddleware(InstrumentationMiddleware):
+    """
+    Adds `Server-Timing: db, serialize, app, total` to every response, where
+    serialize is response rendering (DRF's JSON encoding) and app is the rest
+    of the view.
+    """
+    enabled_setting = 'REQUEST_PROFILING'
+    collector_class = QueryCollector
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.slow_threshold = settings.REQUEST_SLOW_THRESHOLD_MS / 1000
+        self.duplicate_threshold = settings.REQUEST_DUPLICATE_QUERY_THRESHOLD
+
+    def start(self, request):
+        request._profiling_render = [None, None]
+
+    def process_template_response(self, request, response):
+        """Called just before DRF renders the response; time the rendering."""
+        timings = getattr(request, '_profiling_render', None)
+        if timings is not None:
+            timings[0] = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: timings.__setitem__(1, time.perf_counter()))
+        return response
+
+    def finish(self, request, response, collector, total):
+        render_started, render_finished = request._profiling_render
+        serialize = render_finished - render_started if render_started and render_finished else 0
+        db = collector.db_time
+        app = max(0, total - db - serialize)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db * 1000:.2f};desc="{collector.count} queries"',
+            f'serialize;dur={serialize * 1000:.2f}',
+            f'app;dur={app * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+        duplicates = collector.duplicates(self.duplicate_threshold)
+        if total >= self.slow_threshold:
+            self.log('slow_request', request, response, collector, total, duplicates, slowest=[
+                {'sql': sql, 'ms': round(duration * 1000, 2)}
+                for sql, duration in collector.slowest(SLOWEST_QUERIES_LOGGED)
+            ])
+        elif duplicates:
+            self.log('duplicate_queries', request, response, collector, total, duplicates)
+        return response
+
+    def log(self, event, request, response, collector, total, duplicates, **extra):
+        record = {
+            'event': event,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(collector.db_time * 1000, 2),
+            'queries': collector.count,
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in duplicates],
+            **extra,
+        }
+        logger.warning(json.dumps(record))
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses text and JSON responses of at least COMPRESSION_MIN_SIZE bytes
+    with the best encoding the client accepts. Streaming responses (exports)
+    are compressed as they stream, sync or async; event streams, responses that
+    are already encoded and paths in COMPRESSION_EXCLUDE_PATHS are left alone.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if (
+            response.has_header('Content-Encoding')
+            or not compression.is_compressible(content_type)
+            or request.path.startswith(tuple(settings.COMPRESSION_EXCLUDE_PATHS))
+            or (not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), compression.available_encodings(content_type)
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compress_stream = compression.compress_async_stream if response.is_async else compression.compress_stream
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # The compressed length isn't known until the stream ends
+            del response.headers['Content-Length']
+        else:
+            compressed = compression.compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The body differs from the identity encoding, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+INDEX_NAME = 'core_product_fulltext'
+
+
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        f'CREATE FULLTEXT INDEX {INDEX_NAME} ON core_product (name, description)'
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(f'DROP INDEX {INDEX_NAME} ON core_product')
+
+
+class Migration(migrations.Migration):
+    """
+    FULLTEXT index used by product search on MySQL.
+    Other databases use the in-process index in core.search instead.
+    """
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
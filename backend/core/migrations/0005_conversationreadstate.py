@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationReadState',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('side', models.CharField(choices=[('user', 'User'), ('admin', 'Admin')], help_text='Who has read up to the pointer', max_length=10)),
+                ('last_read_message_id', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(help_text='Conversation owner', on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Conversation Read State',
+                'verbose_name_plural': 'Conversation Read States',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversationreadstate',
+            constraint=models.UniqueConstraint(fields=('user', 'side'), name='core_readstate_user_side_uniq'),
+        ),
+    ]
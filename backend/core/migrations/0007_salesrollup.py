@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Aggregate existing orders the same way core.rollups.compute_rollups does."""
+    OrderItem = apps.get_model('core', 'OrderItem')
+    SalesRollup = apps.get_model('core', 'SalesRollup')
+    revenue = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    items = OrderItem.objects.annotate(
+        day=TruncDate('order__created_at'),
+        category=Coalesce('product__category', Value('uncategorized')),
+        payment_method=F('order__payment_method'),
+        status=F('order__status'),
+    )
+    rows = []
+    for grouping in (('day', 'category', 'payment_method', 'status'), ('day', 'payment_method', 'status')):
+        for row in items.values(*grouping).annotate(
+            orders=Count('order', distinct=True), items=Sum('quantity'), revenue=revenue
+        ).order_by():
+            rows.append(SalesRollup(
+                day=row['day'], category=row.get('category', ''), payment_method=row['payment_method'],
+                status=row['status'], order_count=row['orders'], item_count=row['items'],
+                revenue=Decimal(row['revenue']).quantize(Decimal('0.01')),
+            ))
+    SalesRollup.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('category', models.CharField(blank=True, help_text='Empty for all categories', max_length=50)),
+                ('payment_method', models.CharField(choices=[('gcash', 'GCash'), ('bank', 'Bank Transfer'), ('cod', 'Cash on Delivery')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('shipped', 'Shipped'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sales Rollup',
+                'verbose_name_plural': 'Sales Rollups',
+                'ordering': ['-day', 'category', 'payment_method', 'status'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='salesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'category', 'payment_method', 'status'), name='core_salesrollup_key_uniq'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_order_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Supplier SKU used by import_products', max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:15
+
+from django.db import migrations, models
+from django.db.models import Max
+
+OTHER_SIDE = {'user': 'admin', 'admin': 'user'}
+
+
+def read_flags_to_pointers(apps, schema_editor):
+    """Move each side's pointer up to the newest message it had flagged read, before the flag goes."""
+    Message = apps.get_model('core', 'Message')
+    ConversationReadState = apps.get_model('core', 'ConversationReadState')
+    for side, sender in OTHER_SIDE.items():
+        rows = Message.objects.filter(sender=sender, read=True).values('user_id').annotate(last=Max('id')).order_by()
+        for row in rows:
+            state, _ = ConversationReadState.objects.get_or_create(user_id=row['user_id'], side=side)
+            if state.last_read_message_id < row['last']:
+                state.last_read_message_id = row['last']
+                state.save(update_fields=['last_read_message_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(read_flags_to_pointers, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='core_msg_read_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='core_msg_unread_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='read',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', '-created_at'], name='core_msg_sender_created_idx'),
+        ),
+    ]
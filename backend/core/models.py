@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 class User(AbstractUser):
     """
@@ -28,13 +30,17 @@ class Product(models.Model):
         ('meats', 'Meats'),
         ('vegetables', 'Vegetables'),
     ]
+    # Fields whose changes the in-process search index has to pick up (see core.search)
+    SEARCH_FIELDS = ('name', 'description', 'category')
 
     id = models.AutoField(primary_key=True)
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True, help_text="Supplier SKU used by import_products")
     name = models.CharField(max_length=255)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, help_text="Resized derivatives of image (see core.images)")
     stock = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -42,10 +48,31 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.name} ({self.category})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_search_fields()
+        return instance
+
+    def remember_search_fields(self):
+        # Read from __dict__ so deferred fields aren't loaded
+        self._saved_search_values = {field: self.__dict__.get(field) for field in self.SEARCH_FIELDS}
+
+    def search_fields_changed(self):
+        """Whether name, description or category differ from the values last loaded or saved."""
+        saved = getattr(self, '_saved_search_values', None)
+        if saved is None:
+            return True
+        return any(saved[field] != self.__dict__.get(field) for field in self.SEARCH_FIELDS)
+
     class Meta:
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['category', '-created_at'], name='core_product_cat_created_idx'),
+            models.Index(fields=['updated_at'], name='core_product_updated_idx'),
+        ]
 
 
 class Order(models.Model):
@@ -66,6 +93,11 @@ class Order(models.Model):
         ('cod', 'Cash on Delivery'),
     ]
 
+    DELIVERY_CHOICES = [
+        ('pickup', 'Pick Up'),
+        ('delivery', 'Delivery'),
+    ]
+
     id = models.CharField(max_length=50, unique=True, primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     total = models.DecimalField(max_digits=10, decimal_places=2)
@@ -74,7 +106,7 @@ class Order(models.Model):
     shipping_address = models.TextField()
     delivery_method = models.CharField(
         max_length=20,
-        choices=[('pickup', 'Pick Up'), ('delivery', 'Delivery')],
+        choices=DELIVERY_CHOICES,
         default='delivery'
     )
     created_at = models.DateTimeField(auto_now_add=True)
@@ -87,6 +119,11 @@ class Order(models.Model):
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='core_order_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='core_order_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='core_order_created_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -107,6 +144,66 @@ class OrderItem(models.Model):
         verbose_name_plural = 'Order Items'
 
 
+class StockReservation(models.Model):
+    """
+    Stock taken off a product for an order, see core.reservations. Held
+    reservations are confirmed once the order is paid, and released (the stock
+    goes back on sale) when the order is cancelled before shipping or expires unpaid.
+    """
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Order is cancelled if still pending by then; empty if it never expires")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id} for Order {self.order_id} ({self.status})"
+
+    class Meta:
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='core_reservation_expiry_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key sent with an order submission and the response it produced,
+    replayed to retries of the same request until expires_at. See core.idempotency.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of the request method, path and body")
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Empty while the first request is running")
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
+
+    class Meta:
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='core_idempotencykey_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='core_idempotencykey_expiry_idx'),
+        ]
+
+
 class Message(models.Model):
     """
     Message model for customer support chat.
@@ -120,7 +217,6 @@ class Message(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='messages')
     sender = models.CharField(max_length=10, choices=SENDER_CHOICES)
     text = models.TextField()
-    read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -130,3 +226,104 @@ class Message(models.Model):
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='core_msg_user_created_idx'),
+            # Unread count per conversation: messages from one side above the read pointer
+            models.Index(fields=['user', 'sender', 'id'], name='core_msg_user_sender_id_idx'),
+            # Admin list of customer messages above each conversation's read pointer
+            models.Index(fields=['sender', '-created_at'], name='core_msg_sender_created_idx'),
+        ]
+
+
+class ConversationReadState(models.Model):
+    """
+    Read pointer for one side of a customer's support conversation.
+    Messages from the other side with id <= last_read_message_id are read, so
+    marking a whole conversation read is a single write and unread counts are
+    a range query over the newest messages only.
+    """
+    SIDE_CHOICES = Message.SENDER_CHOICES
+
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_states', help_text="Conversation owner")
+    side = models.CharField(max_length=10, choices=SIDE_CHOICES, help_text="Who has read up to the pointer")
+    last_read_message_id = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} read by {self.side} up to {self.last_read_message_id}"
+
+    class Meta:
+        verbose_name = 'Conversation Read State'
+        verbose_name_plural = 'Conversation Read States'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'side'], name='core_readstate_user_side_uniq'),
+        ]
+
+
+class Job(models.Model):
+    """
+    Background job stored in the database and executed by `manage.py run_worker`.
+    See core.jobs for enqueueing and claiming.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0, help_text="Higher priority jobs run first")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not claimed before this time")
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Job {self.id} {self.name} ({self.status})"
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['-priority', 'run_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_at'], name='core_job_claim_idx'),
+        ]
+
+
+class SalesRollup(models.Model):
+    """
+    Daily sales totals per category, payment method and order status, maintained
+    incrementally by core.rollups. Rows with an empty category hold the
+    order-level totals across all categories.
+    """
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    category = models.CharField(max_length=50, blank=True, help_text="Empty for all categories")
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_CHOICES)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.day} {self.category or 'all'} {self.payment_method} {self.status}: {self.revenue}"
+
+    class Meta:
+        verbose_name = 'Sales Rollup'
+        verbose_name_plural = 'Sales Rollups'
+        ordering = ['-day', 'category', 'payment_method', 'status']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'category', 'payment_method', 'status'], name='core_salesrollup_key_uniq'
+            ),
+        ]
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+    Each page is a range scan starting at the opaque ?cursor= position, so page N
+    costs the same as page 1. Page size defaults to REST_FRAMEWORK['PAGE_SIZE'] and
+    can be changed per request with ?page_size= (capped at max_page_size).
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class InboxCursorPagination(CreatedAtCursorPagination):
+    """Keyset pagination for the admin inbox, most recently active conversation first."""
+    ordering = ('-last_activity', '-user_id')
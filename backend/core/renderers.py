@@ -0,0 +1,43 @@
+"""
+orjson-backed JSON rendering for read-heavy endpoints.
+
+FastJSONRenderer writes the same bytes as DRF's JSONRenderer with the default
+settings (compact separators, UTF-8 without \\u escapes, U+2028/U+2029 escaped,
+datetimes as ISO 8601 with `Z` for UTC) but encodes in C. Types orjson doesn't
+know, such as Decimal and lazy translation strings, go through DRF's own
+JSONEncoder.default. Anything orjson rejects (integers over 64 bits, non-string
+dict keys) and browsable/indented output fall back to JSONRenderer.
+
+One difference remains: floats with large exponents are written as `1e16`
+rather than `1e+16`, so views returning floats should stay on JSONRenderer.
+"""
+import orjson
+from django.conf import settings
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or not settings.FAST_SERIALIZATION
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, so the output is safe inside <script>
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+FAST_RENDERER_CLASSES = [FastJSONRenderer, BrowsableAPIRenderer]
@@ -0,0 +1,158 @@
+"""
+Stock reservations for orders.
+
+Placing an order takes its quantities off Product.stock with one conditional
+UPDATE: a product row only matches while it still has enough stock, so
+concurrent checkouts can never oversell, and no row is locked before that
+statement, so checkouts of the same hot product only wait on each other for
+the duration of the UPDATE rather than the whole order. Each product taken is
+recorded as a held StockReservation.
+
+Paying, shipping or completing an order confirms its reservations. Cancelling
+an order that hasn't shipped releases them and adds the stock back; stock of
+shipped or completed orders has left the farm and stays sold, and deleting an
+order only returns stock that is still held. Orders paid up front (GCash, bank
+transfer) that are still pending STOCK_RESERVATION_TTL seconds after checkout
+are cancelled, so unpaid orders don't hold stock during a sale. A delayed
+'orders.expire_reservations' job handles each order when it expires and
+`manage.py release_expired_reservations` sweeps up any a worker missed.
+"""
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from core import rollups
+from core.cache import invalidate_products
+from core.jobs import enqueue
+from core.models import Order, Product, StockReservation
+
+# Cash on delivery is paid on arrival, so those orders wait for an admin instead
+EXPIRING_PAYMENT_METHODS = {'gcash', 'bank'}
+CONFIRMED_STATUSES = {'paid', 'shipped', 'completed'}
+FULFILLED_STATUSES = {'shipped', 'completed'}
+
+
+def _adjust_stock(deltas, now):
+    """{product_id: delta} applied in one UPDATE; negative deltas need that much stock left."""
+    condition = reduce(or_, (
+        Q(pk=pid, stock__gte=-delta) if delta < 0 else Q(pk=pid) for pid, delta in deltas.items()
+    ))
+    updated = Product.objects.filter(condition).update(
+        stock=Case(*(When(pk=pid, then=F('stock') + delta) for pid, delta in deltas.items()), default=F('stock')),
+        updated_at=now,
+    )
+    # The bulk UPDATE bypasses Product signals, so drop cached responses showing these products
+    product_ids = list(deltas)
+    transaction.on_commit(lambda: invalidate_products(product_ids))
+    return updated
+
+
+def reserve(order, quantities):
+    """
+    Take {product_id: quantity} off stock for `order`, in the transaction that
+    creates the order. Returns False when a product no longer has enough stock;
+    the caller must then roll back.
+    """
+    now = timezone.now()
+    expires_at = None
+    if order.payment_method in EXPIRING_PAYMENT_METHODS:
+        ttl = timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+        expires_at = now + ttl
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=pid, quantity=qty, expires_at=expires_at)
+        for pid, qty in quantities.items()
+    ])
+    if expires_at is not None:
+        # Queued once the reservations are committed, so the job always finds them
+        order_id = order.pk
+        transaction.on_commit(lambda: enqueue('orders.expire_reservations', delay=ttl, order_id=order_id))
+    # Last, so the product rows stay locked for as short a time as possible
+    return _adjust_stock({pid: -qty for pid, qty in quantities.items()}, now) == len(quantities)
+
+
+def release(order, statuses=('held',)):
+    """
+    Put the stock of `order`'s reservations in `statuses` back on sale.
+    Returns the number of reservations released.
+    """
+    held = list(
+        StockReservation.objects.select_for_update()
+        .filter(order=order, status__in=statuses)
+        .values_list('pk', 'product_id', 'quantity')
+    )
+    if not held:
+        return 0
+
+    now = timezone.now()
+    # The status guard keeps databases without row locks (SQLite) from releasing twice
+    released = StockReservation.objects.filter(
+        pk__in=[pk for pk, _, _ in held], status__in=statuses
+    ).update(status='released', updated_at=now)
+    if not released:
+        return 0
+
+    deltas = {}
+    for _, product_id, quantity in held:
+        deltas[product_id] = deltas.get(product_id, 0) + quantity
+    _adjust_stock(deltas, now)
+    return released
+
+
+def confirm(order):
+    """Stop `order`'s reservations from expiring; they are still released if it is cancelled before shipping."""
+    return StockReservation.objects.filter(order=order, status='held').update(
+        status='confirmed', updated_at=timezone.now()
+    )
+
+
+def status_change_error(old_status, new_status):
+    """Why an order can't move from `old_status` to `new_status`, or None if it can."""
+    if old_status == 'cancelled' and new_status != 'cancelled':
+        # Its stock has been put back on sale and may be sold already
+        return 'Cancelled orders cannot be reopened'
+    return None
+
+
+def order_status_changed(order, old_status):
+    """Confirm or release `order`'s reservations after it moved from `old_status` to its current status."""
+    if order.status == 'cancelled':
+        if old_status in FULFILLED_STATUSES:
+            return 0
+        return release(order, statuses=('held', 'confirmed'))
+    if order.status in CONFIRMED_STATUSES:
+        return confirm(order)
+    return 0
+
+
+def expire(order_ids=None, now=None):
+    """
+    Cancel pending orders whose reservations have expired and release their
+    stock, optionally only among `order_ids`. Returns the number of orders cancelled.
+    """
+    now = now or timezone.now()
+    due = StockReservation.objects.filter(status='held', expires_at__lte=now)
+    if order_ids is not None:
+        due = due.filter(order_id__in=order_ids)
+
+    cancelled = 0
+    for order_id in list(due.values_list('order_id', flat=True).distinct()):
+        with transaction.atomic():
+            order = Order.objects.filter(pk=order_id).first()
+            if order is None:
+                continue
+            # Only cancel from pending, so a payment recorded meanwhile wins
+            if order.status == 'pending' and Order.objects.filter(pk=order_id, status='pending').update(
+                status='cancelled', updated_at=now
+            ):
+                order.status = 'cancelled'
+                rollups.record_status_change(order, order.items.select_related('product'), 'pending')
+                cancelled += 1
+                order_status_changed(order, 'pending')
+            else:
+                order_status_changed(order, order.status)
+    return cancelled
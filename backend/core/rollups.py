@@ -0,0 +1,127 @@
+"""
+Daily sales rollups (SalesRollup) kept up to date as orders change, so sales
+dashboards read a few pre-aggregated rows instead of scanning Order/OrderItem.
+
+Each order adds to one row per (day, category, payment_method, status) for the
+categories it contains, plus one ALL_CATEGORIES row holding order-level totals.
+Per-category order counts are "orders containing the category", so totals over
+several categories must be read from the ALL_CATEGORIES rows instead.
+
+Updates are incremental deltas applied in the caller's transaction, except for
+new orders, whose deltas checkout applies right after its commit so the hot
+per-day rows aren't locked while an order is placed. If products are deleted
+or change category, or a post-commit update is lost, the rows drift from live
+data, and `manage.py rebuild_sales_rollups` recomputes them from scratch.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from core.models import OrderItem, SalesRollup
+
+ALL_CATEGORIES = ''
+UNCATEGORIZED = 'uncategorized'  # Items whose product has been deleted
+
+
+def contributions(order, items, status=None):
+    """
+    Rollup deltas for one order: {(day, category, payment_method, status): [orders, items, revenue]}.
+    `items` must have their products loaded (select_related or assigned objects).
+    """
+    day = timezone.localdate(order.created_at)
+    status = status or order.status
+    totals = {}
+    for item in items:
+        category = item.product.category if item.product else UNCATEGORIZED
+        for key_category in (category, ALL_CATEGORIES):
+            row = totals.setdefault((day, key_category, order.payment_method, status), [1, 0, Decimal('0.00')])
+            row[1] += item.quantity
+            row[2] += item.price * item.quantity
+    return totals
+
+
+def _add(key, order_count, item_count, revenue):
+    day, category, payment_method, status = key
+    lookup = {'day': day, 'category': category, 'payment_method': payment_method, 'status': status}
+    changes = {
+        'order_count': F('order_count') + order_count,
+        'item_count': F('item_count') + item_count,
+        'revenue': F('revenue') + revenue,
+        'updated_at': timezone.now(),
+    }
+    if SalesRollup.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SalesRollup.objects.create(order_count=order_count, item_count=item_count, revenue=revenue, **lookup)
+    except IntegrityError:
+        # Another transaction created the row first
+        SalesRollup.objects.filter(**lookup).update(**changes)
+
+
+def _apply(deltas, sign):
+    for key, (order_count, item_count, revenue) in sorted(deltas.items()):
+        _add(key, sign * order_count, sign * item_count, sign * revenue)
+
+
+def record_order(order, items):
+    _apply(contributions(order, items), 1)
+
+
+def remove_order(order, items):
+    _apply(contributions(order, items), -1)
+
+
+def record_status_change(order, items, old_status):
+    """Move an order's totals from its `old_status` rows to its current status rows."""
+    if old_status == order.status:
+        return
+    _apply(contributions(order, items, status=old_status), -1)
+    _apply(contributions(order, items), 1)
+
+
+def compute_rollups():
+    """
+    Rollup rows aggregated from the live order tables, keyed like contributions():
+    {(day, category, payment_method, status): (orders, items, revenue)}.
+    """
+    revenue = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    items = OrderItem.objects.annotate(
+        day=TruncDate('order__created_at'),
+        category=Coalesce('product__category', Value(UNCATEGORIZED)),
+        payment_method=F('order__payment_method'),
+        status=F('order__status'),
+    )
+    rows = {}
+    for grouping in (('day', 'category', 'payment_method', 'status'), ('day', 'payment_method', 'status')):
+        for row in items.values(*grouping).annotate(
+            orders=Count('order', distinct=True), items=Sum('quantity'), revenue=revenue
+        ).order_by():
+            key = (row['day'], row.get('category', ALL_CATEGORIES), row['payment_method'], row['status'])
+            rows[key] = (row['orders'], row['items'], Decimal(row['revenue']).quantize(Decimal('0.01')))
+    return rows
+
+
+def stored_rollups():
+    return {
+        (row.day, row.category, row.payment_method, row.status): (row.order_count, row.item_count, row.revenue)
+        for row in SalesRollup.objects.all()
+    }
+
+
+@transaction.atomic
+def rebuild():
+    """Replace every rollup row with totals recomputed from the order tables. Returns the row count."""
+    rows = compute_rollups()
+    SalesRollup.objects.all().delete()
+    SalesRollup.objects.bulk_create([
+        SalesRollup(
+            day=day, category=category, payment_method=payment_method, status=status,
+            order_count=order_count, item_count=item_count, revenue=revenue,
+        )
+        for (day, category, payment_method, status), (order_count, item_count, revenue) in rows.items()
+    ], batch_size=500)
+    return len(rows)
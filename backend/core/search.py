@@ -0,0 +1,180 @@
+"""
+Product search with relevance ranking.
+
+On MySQL a FULLTEXT index over (name, description) (migration 0002) answers
+queries with MATCH ... AGAINST and results are ordered by its relevance score.
+Other databases (SQLite in development and tests) fall back to an in-process
+inverted index that is built on first use and kept in sync through Product
+signals.
+"""
+import heapq
+import math
+import re
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, When
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Product
+
+SEARCH_VERSION_KEY = 'catalog:search_version'
+SEARCH_PARAMS = ('q', 'search')
+NAME_WEIGHT = 3
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def search_version():
+    version = cache.get(SEARCH_VERSION_KEY)
+    if version is None:
+        cache.add(SEARCH_VERSION_KEY, 1, timeout=None)
+        version = cache.get(SEARCH_VERSION_KEY, 1)
+    return version
+
+
+def bump_search_version():
+    try:
+        return cache.incr(SEARCH_VERSION_KEY)
+    except ValueError:
+        cache.add(SEARCH_VERSION_KEY, 1, timeout=None)
+        return None
+
+
+class InvertedIndex:
+    """
+    Term -> {product_id: weighted term frequency} postings with TF-IDF scoring.
+    Name matches weigh NAME_WEIGHT times more than description matches, and a
+    product matching more of the query's words ranks above one matching fewer.
+
+    Product saves in this process are applied in place. Saves in other worker
+    processes bump a shared search version (through the cache), which makes
+    this copy rebuild itself on the next search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._doc_terms = {}
+        self.version = None
+
+    def _add(self, product_id, name, description):
+        terms = {}
+        for term in tokenize(name):
+            terms[term] = terms.get(term, 0) + NAME_WEIGHT
+        for term in tokenize(description):
+            terms[term] = terms.get(term, 0) + 1
+        for term, weight in terms.items():
+            self._postings.setdefault(term, {})[product_id] = weight
+        self._doc_terms[product_id] = terms.keys()
+
+    def _remove(self, product_id):
+        for term in self._doc_terms.pop(product_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def rebuild(self):
+        version = search_version()
+        rows = Product.objects.values_list('id', 'name', 'description').iterator(chunk_size=2000)
+        with self._lock:
+            self._postings = {}
+            self._doc_terms = {}
+            for product_id, name, description in rows:
+                self._add(product_id, name, description)
+            self.version = version
+
+    def update_product(self, product):
+        self._apply(lambda: (self._remove(product.pk), self._add(product.pk, product.name, product.description)))
+
+    def remove_product(self, product_id):
+        self._apply(lambda: self._remove(product_id))
+
+    def _apply(self, change):
+        with self._lock:
+            previous = self.version
+            new = bump_search_version()
+            if previous is None or new is None:
+                self.version = None
+            elif new == previous + 1:
+                # No other process changed the catalog since our last sync
+                change()
+                self.version = new
+            else:
+                self.version = None
+
+    def search(self, query, limit):
+        """Return up to `limit` product ids, best match first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        if self.version is None or self.version != search_version():
+            self.rebuild()
+
+        with self._lock:
+            total_docs = len(self._doc_terms) or 1
+            scores = {}
+            matched = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total_docs / len(postings))
+                for product_id, weight in postings.items():
+                    scores[product_id] = scores.get(product_id, 0) + weight * idf
+                    matched[product_id] = matched.get(product_id, 0) + 1
+
+        best = heapq.nlargest(
+            limit, scores.items(), key=lambda item: (matched[item[0]], item[1])
+        )
+        return [product_id for product_id, _ in best]
+
+
+search_index = InvertedIndex()
+
+
+def fulltext_supported():
+    return connection.vendor == 'mysql'
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Filter products by ?q= (or DRF's ?search=) and order them by relevance.
+    An explicit ?ordering= still takes precedence through OrderingFilter.
+    """
+
+    def get_search_query(self, request):
+        for param in SEARCH_PARAMS:
+            value = request.query_params.get(param, '').strip()
+            if value:
+                return value
+        return ''
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+
+        if fulltext_supported():
+            relevance = RawSQL(
+                'MATCH (core_product.name, core_product.description) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+                (query,)
+            )
+            return queryset.annotate(relevance=relevance).filter(relevance__gt=0).order_by('-relevance', '-id')
+
+        ids = search_index.search(query, settings.PRODUCT_SEARCH_MAX_RESULTS)
+        if not ids:
+            return queryset.none()
+        rank = Case(
+            *(When(pk=product_id, then=position) for position, product_id in enumerate(ids)),
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=ids).order_by(rank)
@@ -1,6 +1,84 @@
+from decimal import Decimal
+
 from rest_framework import serializers
+from core.images import DERIVATIVE_SIZES, ENCODE_OPTIONS, variants_are_current
 from core.models import User, Product, Order, OrderItem, Message
 from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+CENTS = Decimal('0.01')
+
+
+class FieldSelection:
+    """
+    The fields a client asked for with ?fields= and ?expand=, at one nesting level.
+
+    `schema` maps each output field to the schema of its nested object (or None),
+    `paths` are the requested dotted paths below this level (None means every
+    field) and `expandable` lists the relation paths that are sent as a primary
+    key unless expanded, either through `expand` or by asking for a subfield.
+    """
+
+    def __init__(self, schema, paths=None, expand=(), expandable=()):
+        self.schema = schema
+        self.paths = paths
+        self.expand = set(expand)
+        self.expandable = set(expandable)
+        if paths is None:
+            self.names = list(schema)
+        else:
+            heads = {path.split('.', 1)[0] for path in paths}
+            self.names = [name for name in schema if name in heads]
+
+    def expanded(self, name):
+        if name not in self.expandable:
+            return True
+        return name in self.expand or any(path.startswith(f'{name}.') for path in self.paths or ())
+
+    def child(self, name):
+        def below(paths):
+            return [path[len(name) + 1:] for path in paths if path.startswith(f'{name}.')]
+
+        paths = below(self.paths) if self.paths is not None else None
+        return FieldSelection(self.schema[name], paths or None, below(self.expand), below(self.expandable))
+
+
+class SparseFieldsMixin:
+    """
+    Limits a serializer's output to a FieldSelection: context['selection'] for
+    the top-level serializer, handed down to nested serializers. Relations in
+    `collapsed_fields` that aren't expanded are sent as their primary key.
+    """
+    collapsed_fields = {}  # field name -> attribute holding the related primary key
+
+    @property
+    def selection(self):
+        if hasattr(self, '_selection'):
+            return self._selection
+        parent = self.parent
+        if parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return self.context.get('selection')
+        return None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.selection
+        if selection is None:
+            return fields
+
+        selected = {}
+        for name, field in fields.items():
+            if field.write_only:
+                selected[name] = field
+                continue
+            if name not in selection.names:
+                continue
+            if name in self.collapsed_fields and not selection.expanded(name):
+                field = serializers.IntegerField(source=self.collapsed_fields[name], read_only=True)
+            elif isinstance(getattr(field, 'child', field), SparseFieldsMixin):
+                getattr(field, 'child', field)._selection = selection.child(name)
+            selected[name] = field
+        return selected
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -33,16 +111,67 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    """Serializer for Product model with image support."""
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for Product model with image support and resized image variants."""
+    image_variants = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
-        fields = ['id', 'name', 'category', 'price', 'description', 'image', 'stock', 'created_at']
+        fields = ['id', 'sku', 'name', 'category', 'price', 'description', 'image', 'image_variants', 'image_srcset', 'stock', 'created_at']
         read_only_fields = ['id', 'created_at']
 
+    def validate_sku(self, value):
+        # Blank SKUs are stored as NULL so they don't collide on the unique index
+        return value or None
+
+    def _variant_url(self, name):
+        return product_image_url(name, self.context.get('request'))
+
+    def _current_variants(self, obj):
+        if not variants_are_current(obj):
+            return []
+        return current_variants(obj.image_variants)
+
+    def get_image_variants(self, obj):
+        """{variant: {width, height, <format>: url}} for thumb, card and detail sizes."""
+        return image_variants_payload(self._current_variants(obj), self._variant_url)
+
+    def get_image_srcset(self, obj):
+        """{format: 'url 160w, url 480w, ...'} ready for <source srcset>."""
+        return image_srcset_payload(self._current_variants(obj), self._variant_url)
+
+
+# Image fields shared by ProductSerializer and ProductRowSerializer
+
+def product_image_url(name, request=None):
+    url = Product._meta.get_field('image').storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def current_variants(image_variants):
+    return [(variant, image_variants[variant]) for variant in DERIVATIVE_SIZES if variant in image_variants]
+
+
+def image_variants_payload(variants, url):
+    return {
+        variant: {key: url(value) if key in ENCODE_OPTIONS else value for key, value in entry.items()}
+        for variant, entry in variants
+    }
+
+
+def image_srcset_payload(variants, url):
+    srcset = {}
+    for variant, entry in variants:
+        for fmt in ENCODE_OPTIONS:
+            if fmt in entry:
+                srcset.setdefault(fmt, []).append(f"{url(entry[fmt])} {entry['width']}w")
+    return {fmt: ', '.join(candidates) for fmt, candidates in srcset.items()}
 
-class OrderItemSerializer(serializers.ModelSerializer):
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for OrderItem model with product details."""
+    collapsed_fields = {'product': 'product_id'}
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), write_only=True, source='product')
 
@@ -52,7 +181,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'price']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Order model with nested items."""
     items = OrderItemSerializer(many=True, read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
@@ -85,5 +214,169 @@ class MessageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Message
-        fields = ['id', 'user_email', 'sender', 'text', 'read', 'created_at']
+        fields = ['id', 'user_email', 'sender', 'text', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+
+class ConversationSummarySerializer(serializers.Serializer):
+    """One row of the admin support inbox: a customer conversation summary."""
+    user_id = serializers.IntegerField()
+    user_email = serializers.EmailField(source='user__email')
+    username = serializers.CharField(source='user__username')
+    last_message_id = serializers.IntegerField()
+    last_message_preview = serializers.CharField()
+    last_message_sender = serializers.CharField()
+    last_activity = serializers.DateTimeField()
+    unread_count = serializers.IntegerField()
+    message_count = serializers.IntegerField()
+
+
+# Output schemas for ?fields= / ?expand= (see FieldSelection)
+PRODUCT_SCHEMA = dict.fromkeys(ProductSerializer.Meta.fields)
+ORDER_ITEM_SCHEMA = {'id': None, 'product': PRODUCT_SCHEMA, 'quantity': None, 'price': None}
+ORDER_SCHEMA = {**dict.fromkeys(OrderSerializer.Meta.fields), 'items': ORDER_ITEM_SCHEMA}
+ORDER_EXPANDABLE = ['items.product']
+
+# Model fields each output field is read from, so querysets load only those columns
+PRODUCT_COLUMNS = {
+    'id': ['id'], 'sku': ['sku'], 'name': ['name'], 'category': ['category'], 'price': ['price'],
+    'description': ['description'], 'image': ['image'], 'image_variants': ['image', 'image_variants'],
+    'image_srcset': ['image', 'image_variants'], 'stock': ['stock'], 'created_at': ['created_at'],
+}
+ORDER_COLUMNS = {
+    'id': ['id'], 'user_email': ['user__email'], 'total': ['total'], 'payment_method': ['payment_method'],
+    'status': ['status'], 'shipping_address': ['shipping_address'], 'delivery_method': ['delivery_method'],
+    'items': [], 'created_at': ['created_at'], 'updated_at': ['updated_at'],
+}
+ORDER_ITEM_COLUMNS = {'id': ['id'], 'product': ['product'], 'quantity': ['quantity'], 'price': ['price']}
+
+
+def _columns(mapping, names, required):
+    return list(dict.fromkeys([*required, *(column for name in names for column in mapping[name])]))
+
+
+def product_columns(selection=None):
+    return _columns(PRODUCT_COLUMNS, selection.names if selection else PRODUCT_COLUMNS, ['id'])
+
+
+def order_columns(selection=None):
+    """Order columns for `selection`; created_at and id are always read for cursor pagination."""
+    return _columns(ORDER_COLUMNS, selection.names if selection else ORDER_COLUMNS, ['id', 'created_at'])
+
+
+def order_item_columns(selection=None):
+    """OrderItem columns, with the product's as product__<field> when it is expanded."""
+    columns = _columns(ORDER_ITEM_COLUMNS, selection.names if selection else ORDER_ITEM_COLUMNS, ['id', 'order'])
+    if 'product' in columns and (selection is None or selection.expanded('product')):
+        product = selection.child('product') if selection else None
+        columns += [f'product__{column}' for column in product_columns(product)]
+    return columns
+
+
+def _cents(value):
+    return None if value is None else f'{value.quantize(CENTS):f}'
+
+
+class ProductRowSerializer:
+    """
+    Read-only twin of ProductSerializer for rows from
+    `Product.objects.values(*product_columns(selection))`. It skips model
+    instances and per-field serializer calls; rendered to JSON, the output is
+    byte-for-byte the same. Datetimes are left to the renderer to format.
+    """
+
+    def __init__(self, rows, context=None):
+        context = context or {}
+        self.rows = rows
+        self.request = context.get('request')
+        self.names = context['selection'].names if context.get('selection') else None
+        self.urls = {}
+
+    @property
+    def data(self):
+        tz = timezone.get_current_timezone()
+        return [self.to_representation(row, tz) for row in self.rows]
+
+    def url(self, name):
+        # image_variants and image_srcset repeat the same derivative URLs
+        if name not in self.urls:
+            self.urls[name] = product_image_url(name, self.request)
+        return self.urls[name]
+
+    def to_representation(self, row, tz, prefix=''):
+        image = row.get(f'{prefix}image')
+        image_variants = row.get(f'{prefix}image_variants') or {}
+        variants = current_variants(image_variants) if image and image_variants.get('source') == image else []
+        created_at = row.get(f'{prefix}created_at')
+        data = {
+            'id': row[f'{prefix}id'],
+            'sku': row.get(f'{prefix}sku'),
+            'name': row.get(f'{prefix}name'),
+            'category': row.get(f'{prefix}category'),
+            'price': _cents(row.get(f'{prefix}price')),
+            'description': row.get(f'{prefix}description'),
+            'image': self.url(image) if image else None,
+            'image_variants': image_variants_payload(variants, self.url),
+            'image_srcset': image_srcset_payload(variants, self.url),
+            'stock': row.get(f'{prefix}stock'),
+            'created_at': created_at.astimezone(tz) if created_at else None,
+        }
+        return data if self.names is None else {name: data[name] for name in self.names}
+
+
+class OrderRowSerializer:
+    """
+    Read-only twin of OrderSerializer for rows from
+    `Order.objects.values(*order_columns(selection))`. The items of all rows
+    are loaded with one values() query, as order_queryset() does with
+    prefetching, and not at all when the selection leaves them out.
+    """
+
+    def __init__(self, rows, context=None):
+        context = context or {}
+        self.rows = rows
+        self.selection = context.get('selection')
+        self.names = self.selection.names if self.selection else None
+        self.items = self.selection.child('items') if self.selection else None
+        self.product_expanded = self.items is None or self.items.expanded('product')
+        self.products = ProductRowSerializer(
+            [], {'selection': self.items.child('product') if self.items else None}
+        )
+
+    @property
+    def data(self):
+        tz = timezone.get_current_timezone()
+        items = {row['id']: [] for row in self.rows}
+        if self.names is None or 'items' in self.names:
+            item_rows = OrderItem.objects.filter(order_id__in=list(items)).order_by('id')
+            for item in item_rows.values(*order_item_columns(self.items)):
+                items[item['order']].append(self.item_representation(item, tz))
+        return [self.to_representation(row, items[row['id']], tz) for row in self.rows]
+
+    def item_representation(self, item, tz):
+        product = item.get('product')
+        if product is not None and self.product_expanded:
+            product = self.products.to_representation(item, tz, prefix='product__')
+        data = {
+            'id': item['id'],
+            'product': product,
+            'quantity': item.get('quantity'),
+            'price': _cents(item.get('price')),
+        }
+        return data if self.items is None else {name: data[name] for name in self.items.names}
+
+    def to_representation(self, row, items, tz):
+        updated_at = row.get('updated_at')
+        data = {
+            'id': row['id'],
+            'user_email': row.get('user__email'),
+            'total': _cents(row.get('total')),
+            'payment_method': row.get('payment_method'),
+            'status': row.get('status'),
+            'shipping_address': row.get('shipping_address'),
+            'delivery_method': row.get('delivery_method'),
+            'items': items,
+            'created_at': row['created_at'].astimezone(tz),
+            'updated_at': updated_at.astimezone(tz) if updated_at else None,
+        }
+        return data if self.names is None else {name: data[name] for name in self.names}
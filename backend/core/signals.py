@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.cache import invalidate_catalog
+from core.images import refresh_derivatives, variants_are_current
+from core.jobs import enqueue
+from core.models import Message, Order, Product
+from core.reservations import release
+from core.rollups import remove_order
+from core.search import fulltext_supported, search_index
+from core.streams import broadcaster
+
+
+@receiver(post_save, sender=Product)
+def generate_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Queue resized variants when a product image is uploaded or replaced."""
+    if raw:
+        return
+    if instance.image and not variants_are_current(instance):
+        product_id = instance.pk
+        transaction.on_commit(
+            lambda: enqueue('products.generate_image_derivatives', product_id=product_id)
+        )
+    elif not instance.image and instance.image_variants:
+        refresh_derivatives(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Any product change makes cached catalog responses stale."""
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """Update the in-process search index, which FULLTEXT search on MySQL doesn't use."""
+    if not fulltext_supported() and instance.search_fields_changed():
+        search_index.update_product(instance)
+    instance.remember_search_fields()
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    if not fulltext_supported():
+        search_index.remove_product(instance.pk)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    """Take a deleted order out of the sales rollups while its items still exist."""
+    remove_order(instance, instance.items.select_related('product'))
+
+
+@receiver(pre_delete, sender=Order)
+def release_deleted_order_stock(sender, instance, **kwargs):
+    """Put stock still held for a deleted order back on sale; confirmed (paid or shipped) stock stays sold."""
+    release(instance)
+
+
+@receiver(post_save, sender=Message)
+def push_new_message(sender, instance, created, **kwargs):
+    """Wake open message streams once the new message is committed."""
+    if created:
+        transaction.on_commit(broadcaster.notify)
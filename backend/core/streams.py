@@ -0,0 +1,100 @@
+"""
+Server-Sent Events support for pushing new support chat messages.
+
+Message saves wake every open stream in the same process immediately. Streams
+also re-check the database every STREAM_POLL_INTERVAL seconds, which picks up
+messages written by other worker processes. Each check is an indexed
+`id > last_id` query, so a stream only ever reads the new rows.
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+
+from core.models import Message
+from core.serializers import MessageSerializer
+
+STREAM_POLL_INTERVAL = 5     # seconds between database checks without a local wakeup
+STREAM_HEARTBEAT = 15        # seconds between keep-alive comments
+STREAM_MAX_DURATION = 300    # seconds before the server ends the stream (clients reconnect)
+STREAM_BATCH_SIZE = 100
+STREAM_RETRY_MS = 3000
+
+
+class MessageBroadcaster:
+    """Wakes waiting streams (asyncio) when a Message is created in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    def subscribe(self):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter):
+        with self._lock:
+            self._waiters.discard(waiter)
+
+    def notify(self):
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+
+broadcaster = MessageBroadcaster()
+
+
+def latest_message_id():
+    return Message.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def new_messages(last_id, user_id=None):
+    messages = Message.objects.filter(id__gt=last_id).select_related('user').order_by('id')
+    if user_id is not None:
+        messages = messages.filter(user_id=user_id)
+    return list(messages[:STREAM_BATCH_SIZE])
+
+
+def format_event(message):
+    data = json.dumps(MessageSerializer(message).data, separators=(',', ':'))
+    return f'id: {message.id}\nevent: message\ndata: {data}\n\n'
+
+
+async def message_events(last_id, user_id=None):
+    """
+    Yield SSE frames for messages with id > last_id (optionally for one user)
+    until STREAM_MAX_DURATION elapses.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    last_sent = started
+    waiter = broadcaster.subscribe()
+    _, wakeup = waiter
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        while loop.time() - started < STREAM_MAX_DURATION:
+            wakeup.clear()
+            messages = await sync_to_async(new_messages)(last_id, user_id)
+            for message in messages:
+                yield format_event(message)
+                last_id = message.id
+            if messages:
+                last_sent = loop.time()
+                if len(messages) == STREAM_BATCH_SIZE:
+                    continue
+
+            if loop.time() - last_sent >= STREAM_HEARTBEAT:
+                yield ': ping\n\n'
+                last_sent = loop.time()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=STREAM_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        broadcaster.unsubscribe(waiter)
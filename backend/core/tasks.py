@@ -0,0 +1,22 @@
+"""
+Background tasks run by `manage.py run_worker` (see core.jobs).
+"""
+from core.cache import invalidate_catalog
+from core.images import refresh_derivatives
+from core.jobs import job
+from core.models import Product
+from core.reservations import expire
+
+
+@job('products.generate_image_derivatives')
+def generate_image_derivatives(product_id):
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None:
+        return
+    refresh_derivatives(product)
+    invalidate_catalog()
+
+
+@job('orders.expire_reservations')
+def expire_reservations(order_id):
+    expire(order_ids=[order_id])
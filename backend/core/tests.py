@@ -0,0 +1,401 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import reservations
+from core.db.backends.mysql_pool import base as mysql_pool
+from core.models import Message, Order, OrderItem, Product, StockReservation, User
+
+SIZES = (1, 5, 20)
+
+
+def api_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user=user)
+    return client
+
+
+class OrderQueryCountTests(TestCase):
+    """Order history and order detail take a fixed number of queries, however many orders and items there are."""
+
+    # One query for the orders (with their user) and one for the items with their products
+    LIST_QUERIES = 2
+    DETAIL_QUERIES = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(
+                name=f'Product {n}', category='vegetables', price=Decimal('10.00'),
+                description='Test product', stock=100,
+            )
+            for n in range(max(SIZES))
+        ]
+
+    def create_orders(self, order_count, item_count):
+        user = User.objects.create_user(
+            username=f'buyer-{order_count}-{item_count}',
+            email=f'buyer-{order_count}-{item_count}@example.com',
+            password=None,
+        )
+        orders = []
+        for n in range(order_count):
+            order = Order.objects.create(
+                id=f'ORD-{order_count}-{item_count}-{n}', user=user, total=Decimal('10.00') * item_count,
+                payment_method='cod', shipping_address='1 Test Street', delivery_method='pickup',
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price=product.price)
+                for product in self.products[:item_count]
+            ])
+            orders.append(order)
+        return user, orders, api_client(user)
+
+    def test_order_history_query_count(self):
+        for order_count in SIZES:
+            for item_count in SIZES:
+                with self.subTest(orders=order_count, items=item_count):
+                    user, orders, client = self.create_orders(order_count, item_count)
+                    with self.assertNumQueries(self.LIST_QUERIES):
+                        response = client.get(f'/api/orders/user/{user.id}/')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.json()['results'][0]['items']), item_count)
+
+    def test_order_detail_query_count(self):
+        for order_count in SIZES:
+            for item_count in SIZES:
+                with self.subTest(orders=order_count, items=item_count):
+                    user, orders, client = self.create_orders(order_count, item_count)
+                    with self.assertNumQueries(self.DETAIL_QUERIES):
+                        response = client.get(f'/api/orders/{orders[-1].id}/')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.json()['items']), item_count)
+
+
+class QueryPlanTests(TestCase):
+    """The main API endpoints read every table through an index (see manage.py check_query_plans)."""
+
+    def test_no_full_table_scans(self):
+        # Raises CommandError naming the endpoint and table on a full scan
+        call_command('check_query_plans', stdout=StringIO())
+
+
+class FakeConnection:
+    """Stands in for a MySQL connection: records rollbacks and closes, and can be made to fail."""
+
+    def __init__(self, alive=True, rollback_fails=False):
+        self.alive = alive
+        self.rollback_fails = rollback_fails
+        self.rollbacks = 0
+        self.closed = False
+
+    def rollback(self):
+        if self.rollback_fails:
+            raise OperationalError('Lost connection')
+        self.rollbacks += 1
+
+    def ping(self, reconnect):
+        if not self.alive:
+            raise OperationalError('Lost connection')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Checkout, return and exhaustion of the pooled MySQL backend (core.db.backends.mysql_pool)."""
+
+    def test_returned_connection_is_reused(self):
+        pool = mysql_pool.ConnectionPool(size=2, timeout=0.05)
+        conn = pool.acquire(FakeConnection, health_check=True)
+        pool.release(conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertIs(pool.acquire(FakeConnection, health_check=True), conn)
+        self.assertEqual(pool.opened, 1)
+
+    def test_unusable_connections_are_closed_instead_of_returned(self):
+        pool = mysql_pool.ConnectionPool(size=1, timeout=0.05)
+        for conn, reusable in ((FakeConnection(), False), (FakeConnection(rollback_fails=True), True)):
+            with self.subTest(reusable=reusable):
+                pool.release(pool.acquire(lambda: conn, health_check=False), reusable=reusable)
+                self.assertTrue(conn.closed)
+                replacement = pool.acquire(FakeConnection, health_check=False)
+                self.assertIsNot(replacement, conn)
+                pool.release(replacement, reusable=False)
+
+    def test_dead_idle_connection_is_replaced_on_checkout(self):
+        pool = mysql_pool.ConnectionPool(size=1, timeout=0.05)
+        dead = FakeConnection()
+        pool.release(pool.acquire(lambda: dead, health_check=True))
+        dead.alive = False
+        conn = pool.acquire(FakeConnection, health_check=True)
+        self.assertIsNot(conn, dead)
+        self.assertTrue(dead.closed)
+
+    def test_exhausted_pool_raises_until_a_connection_is_returned(self):
+        pool = mysql_pool.ConnectionPool(size=2, timeout=0.05)
+        held = [pool.acquire(FakeConnection, health_check=False) for _ in range(2)]
+        with self.assertRaisesMessage(OperationalError, 'pool exhausted (2 connections in use)'):
+            pool.acquire(FakeConnection, health_check=False)
+        pool.release(held.pop())
+        self.assertEqual(pool.acquire(FakeConnection, health_check=False).rollbacks, 1)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = mysql_pool.ConnectionPool(size=1, timeout=0.05)
+
+        def refuse():
+            raise OperationalError("Can't connect to MySQL server")
+
+        with self.assertRaises(OperationalError):
+            pool.acquire(refuse, health_check=False)
+        self.assertIsInstance(pool.acquire(FakeConnection, health_check=False), FakeConnection)
+
+    def test_backend_returns_connections_to_the_pool_on_close(self):
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'core.db.backends.mysql_pool', 'POOL_SIZE': 1, 'POOL_TIMEOUT': 0.05,
+        }
+        with mock.patch.object(mysql_pool.base.DatabaseWrapper, 'get_new_connection', side_effect=FakeConnection):
+            first = mysql_pool.DatabaseWrapper(settings_dict, alias='pool-test')
+            second = mysql_pool.DatabaseWrapper(settings_dict, alias='pool-test')
+            first.connection = first.get_new_connection({})
+            with self.assertRaises(OperationalError):
+                second.get_new_connection({})
+
+            conn = first.connection
+            first._close()
+            self.assertIs(second.get_new_connection({}), conn)
+            self.assertEqual(first.pool.opened, 1)
+
+            # A connection closed after a database error is not handed out again
+            second.connection = conn
+            second.errors_occurred = True
+            second._close()
+            self.assertTrue(conn.closed)
+
+
+class CartQuoteTests(TestCase):
+    """POST /api/cart/quote/ prices a cart and rejects malformed bodies with 400."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='Carrots', category='vegetables', price=Decimal('12.50'), description='Test product', stock=3,
+        )
+
+    def test_quote_totals_lines_and_reports_missing_products(self):
+        response = api_client().post('/api/cart/quote/', {'items': [
+            {'product_id': self.product.id, 'quantity': 2},
+            {'product_id': self.product.id + 1000, 'quantity': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        quote = response.json()
+        self.assertEqual(quote['total'], '25.00')
+        self.assertEqual(quote['missing'], [self.product.id + 1000])
+        self.assertTrue(quote['items'][0]['available'])
+        self.assertFalse(quote['all_available'])
+
+    def test_quote_flags_lines_above_stock(self):
+        response = api_client().post(
+            '/api/cart/quote/', {'items': [{'product_id': self.product.id, 'quantity': 4}]}, format='json'
+        )
+        self.assertFalse(response.json()['items'][0]['available'])
+        self.assertFalse(response.json()['all_available'])
+
+    def test_malformed_bodies_are_rejected(self):
+        cases = [
+            (['x'], 'Request body must be a JSON object'),
+            ({}, 'items must be a non-empty list'),
+            ({'items': []}, 'items must be a non-empty list'),
+            ({'items': ['x']}, 'Each item needs an integer product_id and quantity'),
+            ({'items': [{'product_id': 'abc', 'quantity': 1}]}, 'Each item needs an integer product_id and quantity'),
+            ({'items': [{'product_id': self.product.id, 'quantity': 0}]}, 'Quantity must be greater than 0'),
+        ]
+        for body, error in cases:
+            with self.subTest(body=body):
+                response = api_client().post('/api/cart/quote/', body, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], error)
+
+
+class CheckoutStockTests(TestCase):
+    """Checkout takes stock off with a reservation; cancelling or expiring the order puts it back."""
+
+    STOCK = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password=None)
+        cls.admin = User.objects.create_user(
+            username='staff', email='staff@example.com', password=None, is_admin=True
+        )
+        cls.product = Product.objects.create(
+            name='Eggs', category='meats', price=Decimal('8.00'), description='Test product', stock=cls.STOCK,
+        )
+
+    def checkout(self, quantity, payment_method='cod', **headers):
+        return api_client(self.buyer).post('/api/orders/', {
+            'payment_method': payment_method, 'shipping_address': '1 Test Street', 'delivery_method': 'pickup',
+            'items': [{'product_id': self.product.id, 'quantity': quantity}],
+        }, format='json', **headers)
+
+    def stock(self):
+        self.product.refresh_from_db(fields=['stock'])
+        return self.product.stock
+
+    def test_checkout_takes_stock_to_zero_then_conflicts(self):
+        response = self.checkout(self.STOCK)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(), 0)
+        self.assertEqual(StockReservation.objects.get(order_id=response.json()['id']).quantity, self.STOCK)
+
+        response = self.checkout(1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['product_ids'], [self.product.id])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.stock(), 0)
+
+    def test_invalid_orders_are_rejected_without_taking_stock(self):
+        for payment_method, error in (('bogus', 'Invalid payment_method'), ('cod', 'Insufficient stock')):
+            with self.subTest(payment_method=payment_method):
+                response = self.checkout(self.STOCK + (payment_method == 'cod'), payment_method=payment_method)
+                self.assertIn(error, response.json()['error'])
+        self.assertEqual(api_client(self.buyer).post('/api/orders/', ['x'], format='json').status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.stock(), self.STOCK)
+
+    def test_cancelling_releases_stock_once(self):
+        order_id = self.checkout(self.STOCK).json()['id']
+        admin = api_client(self.admin)
+        response = admin.put(f'/api/orders/{order_id}/status/', {'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(), self.STOCK)
+
+        # Reopening would sell stock that was already put back
+        response = admin.put(f'/api/orders/{order_id}/status/', {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        admin.put(f'/api/orders/{order_id}/status/', {'status': 'cancelled'}, format='json')
+        self.assertEqual(self.stock(), self.STOCK)
+
+    def test_expired_reservation_cancels_order_and_releases_stock(self):
+        unpaid = self.checkout(1, payment_method='gcash').json()['id']
+        paid = self.checkout(1, payment_method='gcash').json()['id']
+        api_client(self.admin).put(f'/api/orders/{paid}/status/', {'status': 'paid'}, format='json')
+        self.assertEqual(self.stock(), 0)
+
+        later = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL + 1)
+        self.assertEqual(reservations.expire(now=timezone.now()), 0)
+        self.assertEqual(reservations.expire(now=later), 1)
+        self.assertEqual(Order.objects.get(pk=unpaid).status, 'cancelled')
+        self.assertEqual(Order.objects.get(pk=paid).status, 'paid')
+        self.assertEqual(self.stock(), 1)
+
+    def test_idempotent_retry_replays_the_first_response(self):
+        first = self.checkout(1, HTTP_IDEMPOTENCY_KEY='checkout-1')
+        retry = self.checkout(1, HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['id'], first.json()['id'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.stock(), self.STOCK - 1)
+
+        # The same key with a different body is a client bug, not a retry
+        response = self.checkout(2, HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class ReadPointerTests(TestCase):
+    """Unread counts come from each side's read pointer (core.conversations)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(username='customer', email='customer@example.com', password=None)
+        cls.admin = User.objects.create_user(
+            username='support', email='support@example.com', password=None, is_admin=True
+        )
+        cls.questions = [
+            Message.objects.create(user=cls.customer, sender='user', text=f'Question {n}') for n in range(3)
+        ]
+        cls.answers = [
+            Message.objects.create(user=cls.customer, sender='admin', text=f'Answer {n}') for n in range(2)
+        ]
+
+    def read(self, user, body):
+        return api_client(user).post('/api/messages/read/', body, format='json')
+
+    def admin_state(self):
+        return api_client(self.admin).get(f'/api/messages/read/?user_id={self.customer.id}').json()
+
+    def test_unread_counts_follow_each_sides_pointer(self):
+        self.assertEqual(self.admin_state()['unread_count'], 3)
+        state = self.read(self.admin, {'user_id': self.customer.id, 'up_to_id': self.questions[0].id}).json()
+        self.assertEqual(state['last_read_message_id'], self.questions[0].id)
+        self.assertEqual(state['unread_count'], 2)
+
+        customer = api_client(self.customer).get('/api/messages/read/').json()
+        self.assertEqual((customer['side'], customer['unread_count']), ('user', 2))
+        self.assertEqual(self.read(self.customer, {}).json()['unread_count'], 0)
+
+    def test_up_to_id_is_clamped_to_the_latest_message(self):
+        state = self.read(self.admin, {'user_id': self.customer.id, 'up_to_id': 10 ** 9}).json()
+        self.assertEqual(state['last_read_message_id'], self.answers[-1].id)
+        Message.objects.create(user=self.customer, sender='user', text='Follow-up')
+        self.assertEqual(self.admin_state()['unread_count'], 1)
+
+    def test_pointer_only_moves_forward(self):
+        self.read(self.admin, {'user_id': self.customer.id})
+        state = self.read(self.admin, {'user_id': self.customer.id, 'up_to_id': self.questions[0].id}).json()
+        self.assertEqual(state['last_read_message_id'], self.answers[-1].id)
+        self.assertEqual(state['unread_count'], 0)
+
+    def test_invalid_requests_are_rejected(self):
+        for body, code in (
+            (['x'], 400),
+            ({'user_id': self.customer.id, 'up_to_id': -1}, 400),
+            ({'user_id': self.customer.id, 'up_to_id': True}, 400),
+            ({'user_id': self.customer.id, 'up_to_id': 'latest'}, 400),
+            ({}, 400),
+            ({'user_id': self.customer.id + self.admin.id + 1}, 404),
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.read(self.admin, body).status_code, code)
+        self.assertEqual(self.admin_state()['unread_count'], 3)
+
+
+class OrderPaginationTests(TestCase):
+    """Cursor pages of order history cover every order exactly once, newest first, even with equal timestamps."""
+
+    def test_pages_follow_next_links_without_gaps_or_repeats(self):
+        buyer = User.objects.create_user(username='pager', email='pager@example.com', password=None)
+        orders = Order.objects.bulk_create([
+            Order(
+                id=f'ORD-PAGE-{n:02d}', user=buyer, total=Decimal('10.00'), payment_method='cod',
+                shipping_address='1 Test Street', delivery_method='pickup',
+            )
+            for n in range(7)
+        ])
+        # Two pairs share a timestamp, so page boundaries fall inside ties
+        now = timezone.now()
+        for n, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=n // 2))
+
+        client = api_client(buyer)
+        seen = []
+        url = '/api/users/orders/?page_size=2'
+        while url:
+            page = client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen += [row['id'] for row in page['results']]
+            url = page['next']
+        expected = Order.objects.filter(user=buyer).order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
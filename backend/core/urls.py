@@ -16,16 +16,24 @@ urlpatterns = [
 
     # Products
     path('', include(router.urls)),
+    path('cart/quote/', views.CartQuoteAPIView.as_view(), name='cart_quote'),
 
     # Orders
     path('orders/', views.OrderCreateAPIView.as_view(), name='order_create'),
+    path('orders/export/', views.OrderExportAPIView.as_view(), name='order_export'),
     path('orders/user/<int:user_id>/', views.UserOrdersListAPIView.as_view(), name='user_orders'),
     path('orders/<str:order_id>/', views.OrderDetailAPIView.as_view(), name='order_detail'),
     path('orders/<str:order_id>/status/', views.OrderUpdateStatusAPIView.as_view(), name='order_update_status'),
     path('users/orders/', views.UserOrdersCurrentAPIView.as_view(), name='user_orders_current'),
 
+    # Analytics
+    path('analytics/sales/', views.SalesAnalyticsAPIView.as_view(), name='sales_analytics'),
+
     # Messages
     path('messages/', views.MessageCreateAPIView.as_view(), name='message_create'),
     path('messages/user/<int:user_id>/', views.UserMessagesListAPIView.as_view(), name='user_messages'),
     path('messages/admin/', views.AdminMessagesListAPIView.as_view(), name='admin_messages'),
+    path('messages/admin/inbox/', views.AdminInboxAPIView.as_view(), name='admin_inbox'),
+    path('messages/read/', views.ConversationReadAPIView.as_view(), name='messages_read'),
+    path('messages/stream/', views.message_stream, name='message_stream'),
 ]
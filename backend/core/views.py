@@ -2,17 +2,41 @@ from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.exceptions import AuthenticationFailed
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Count, Max, OuterRef, Prefetch, Subquery, Sum, prefetch_related_objects
+from django.db.models.functions import Left
 from django.shortcuts import get_object_or_404
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.contrib.auth import authenticate
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
+from datetime import date, timedelta
+from decimal import Decimal
 import uuid
 
-from core.models import User, Product, Order, OrderItem, Message
+from core.cache import cached_catalog_response
+from core.conversations import mark_read, read_pointer, unread_count, unread_filter
+from core.exports import EXPORT_FORMATS, export_lines, export_queryset, iter_orders, streaming_content
+from core.idempotency import idempotent_response
+from core.models import User, Product, Order, OrderItem, Message, SalesRollup
+from core import metrics, reservations, rollups
+from core.pagination import CreatedAtCursorPagination, InboxCursorPagination
+from core.renderers import FAST_RENDERER_CLASSES
+from core.search import ProductSearchFilter
+from core.streams import latest_message_id, message_events
 from core.serializers import (
     UserSerializer, RegisterSerializer, ProductSerializer,
-    OrderSerializer, OrderItemSerializer, MessageSerializer
+    OrderSerializer, OrderItemSerializer, MessageSerializer, ConversationSummarySerializer,
+    FieldSelection, OrderRowSerializer, ProductRowSerializer,
+    ORDER_EXPANDABLE, ORDER_SCHEMA, PRODUCT_SCHEMA, order_columns, order_item_columns, product_columns,
 )
 
 
@@ -108,12 +132,15 @@ class ProductViewSet(viewsets.ModelViewSet):
     ViewSet for Product CRUD operations.
     - List & retrieve: AllowAny
     - Create, update, destroy: AdminOnly
-    - Search by ?q= and filter by ?category=
+    - Search by ?q= (relevance-ranked, see core.search) and filter by ?category=
+    - List & retrieve responses are cached and support conditional GET (ETag/Last-Modified)
+    - Lists are built from values() rows and rendered with orjson unless FAST_SERIALIZATION is off
+    - List & retrieve accept ?fields= to send (and SELECT) only some fields
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
+    renderer_classes = FAST_RENDERER_CLASSES
+    filter_backends = [ProductSearchFilter, filters.OrderingFilter]
     ordering_fields = ['created_at', 'price']
 
     def get_permissions(self):
@@ -128,18 +155,231 @@ class ProductViewSet(viewsets.ModelViewSet):
         category = self.request.query_params.get('category', None)
         if category:
             queryset = queryset.filter(category=category)
+        if getattr(self, 'selection', None):
+            queryset = queryset.only(*product_columns(self.selection))
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['selection'] = getattr(self, 'selection', None)
+        return context
+
+    def list(self, request, *args, **kwargs):
+        self.selection, error = parse_field_selection(request.query_params, PRODUCT_SCHEMA)
+        if error:
+            return error
+        if not settings.FAST_SERIALIZATION:
+            return cached_catalog_response(
+                request, lambda: super(ProductViewSet, self).list(request, *args, **kwargs)
+            )
+        return cached_catalog_response(request, self.list_rows)
+
+    def list_rows(self):
+        queryset = self.filter_queryset(self.get_queryset()).values(*product_columns(self.selection))
+        page = self.paginate_queryset(queryset)
+        data = ProductRowSerializer(page if page is not None else queryset, context=self.get_serializer_context()).data
+        return self.get_paginated_response(data) if page is not None else Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        self.selection, error = parse_field_selection(request.query_params, PRODUCT_SCHEMA)
+        if error:
+            return error
+        return cached_catalog_response(
+            request,
+            lambda: super(ProductViewSet, self).retrieve(request, *args, **kwargs),
+            queryset=Product.objects.filter(pk=kwargs.get('pk')),
+        )
+
+
+def parse_field_selection(params, schema, expandable=()):
+    """
+    Read ?fields= and ?expand= (comma-separated, dots for nested fields, e.g.
+    fields=id,items.product.name). Returns (selection, error) where selection is
+    a FieldSelection, or None when neither parameter is given, and error is a
+    Response to return to the client, or None.
+    """
+    fields = [path.strip() for path in params.get('fields', '').split(',') if path.strip()]
+    expand = [path.strip() for path in params.get('expand', '').split(',') if path.strip()]
+    if not fields and not expand:
+        return None, None
+
+    def known(path):
+        level = schema
+        for name in path.split('.'):
+            if not isinstance(level, dict) or name not in level:
+                return False
+            level = level[name]
+        return True
+
+    unknown = [path for path in fields if not known(path)] + [path for path in expand if path not in expandable]
+    if unknown:
+        return None, Response(
+            {'error': f'Unknown fields: {", ".join(unknown)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return FieldSelection(schema, fields or None, expand, expandable), None
+
+
+def parse_cart_items(items_data):
+    """
+    Validate a list of {product_id, quantity} dicts.
+    Returns (lines, error) where lines is a list of (product_id, quantity) tuples
+    and error is a Response to return to the client, or None.
+    """
+    if not isinstance(items_data, list) or not items_data:
+        return None, Response(
+            {'error': 'items must be a non-empty list'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    lines = []
+    for item in items_data:
+        try:
+            product_id = int(item.get('product_id'))
+            quantity = int(item.get('quantity'))
+        except (AttributeError, TypeError, ValueError):
+            return None, Response(
+                {'error': 'Each item needs an integer product_id and quantity'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if quantity <= 0:
+            return None, Response(
+                {'error': 'Quantity must be greater than 0'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        lines.append((product_id, quantity))
+    return lines, None
+
+
+ORDER_ITEMS_PREFETCH = Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+
+
+def order_queryset(selection=None):
+    """
+    Orders with everything OrderSerializer reads (user, items and their products)
+    loaded up front, so serializing any number of orders costs a fixed number of queries.
+    With a FieldSelection only the selected columns and relations are loaded.
+    """
+    if selection is None:
+        return Order.objects.select_related('user').prefetch_related(ORDER_ITEMS_PREFETCH)
+
+    orders = Order.objects.only('user', *order_columns(selection))
+    if 'user_email' in selection.names:
+        orders = orders.select_related('user')
+    if 'items' in selection.names:
+        item_selection = selection.child('items')
+        items = OrderItem.objects.only(*order_item_columns(item_selection))
+        if 'product' in item_selection.names and item_selection.expanded('product'):
+            items = items.select_related('product')
+        orders = orders.prefetch_related(Prefetch('items', queryset=items))
+    return orders
+
+
+def paginated_orders_response(request, view, **filters):
+    """
+    Cursor-paginated order history, newest first, honouring ?fields= and ?expand=.
+    Unless FAST_SERIALIZATION is off, pages are read with values() and
+    serialized by OrderRowSerializer.
+    """
+    selection, error = parse_field_selection(request.query_params, ORDER_SCHEMA, ORDER_EXPANDABLE)
+    if error:
+        return error
+
+    paginator = CreatedAtCursorPagination()
+    context = {'selection': selection}
+    if settings.FAST_SERIALIZATION:
+        orders = Order.objects.filter(**filters).values(*order_columns(selection))
+        page = paginator.paginate_queryset(orders, request, view=view)
+        data = OrderRowSerializer(page, context=context).data
+    else:
+        page = paginator.paginate_queryset(order_queryset(selection).filter(**filters), request, view=view)
+        data = OrderSerializer(page, many=True, context=context).data
+    return paginator.get_paginated_response(data)
+
+
+def insufficient_stock_response(product_ids):
+    return Response(
+        {'error': 'Insufficient stock', 'product_ids': product_ids},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+class CartQuoteAPIView(APIView):
+    """
+    POST /api/cart/quote/
+    Price a whole cart in one request (no authentication required).
+    Expects: {items: [{product_id, quantity}]}
+    All products are loaded with a single query.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': 'Request body must be a JSON object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        lines, error = parse_cart_items(request.data.get('items'))
+        if error:
+            return error
+
+        products = Product.objects.in_bulk({product_id for product_id, _ in lines})
+
+        total = Decimal('0.00')
+        items = []
+        missing = []
+        for product_id, quantity in lines:
+            product = products.get(product_id)
+            if product is None:
+                missing.append(product_id)
+                continue
+
+            line_total = product.price * quantity
+            total += line_total
+            items.append({
+                'product_id': product_id,
+                'product': ProductSerializer(product, context={'request': request}).data,
+                'quantity': quantity,
+                'unit_price': str(product.price),
+                'line_total': str(line_total),
+                'stock': product.stock,
+                'available': product.stock >= quantity,
+            })
+
+        return Response({
+            'items': items,
+            'missing': missing,
+            'total': str(total),
+            'all_available': not missing and all(item['available'] for item in items),
+        })
+
 
 class OrderCreateAPIView(APIView):
     """
     POST /api/orders/
     Create a new order (requires authentication).
     Expects: {payment_method, shipping_address, delivery_method, items: [{product_id, quantity}]}
+    Runs a constant number of queries regardless of the number of items; the
+    count is reported in the X-Query-Count response header. Retries that send
+    the same Idempotency-Key header get the first response back (core.idempotency).
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = idempotent_response(request, self.create_order)
+        response['X-Query-Count'] = len(queries)
+        return response
+
+    def create_order(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': 'Request body must be a JSON object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         user = request.user
         payment_method = request.data.get('payment_method')
         shipping_address = request.data.get('shipping_address')
@@ -152,51 +392,69 @@ class OrderCreateAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Generate unique order ID
-        order_id = f"ORD-{timezone.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
-
-        total = 0
-        order_items = []
-
-        for item in items_data:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity')
-
-            try:
-                product = Product.objects.get(id=product_id)
-            except Product.DoesNotExist:
-                return Response(
-                    {'error': f'Product {product_id} not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            if quantity <= 0:
+        for field, value, choices in (
+            ('payment_method', payment_method, Order.PAYMENT_CHOICES),
+            ('delivery_method', delivery_method, Order.DELIVERY_CHOICES),
+        ):
+            allowed = [key for key, label in choices]
+            if value not in allowed:
                 return Response(
-                    {'error': 'Quantity must be greater than 0'},
+                    {'error': f'Invalid {field}. Choose from: {", ".join(allowed)}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            total += product.price * quantity
-            order_items.append({'product': product, 'quantity': quantity, 'price': product.price})
+        lines, error = parse_cart_items(items_data)
+        if error:
+            return error
 
-        order = Order.objects.create(
-            id=order_id,
-            user=user,
-            total=total,
-            payment_method=payment_method,
-            shipping_address=shipping_address,
-            delivery_method=delivery_method,
-            status='pending'
-        )
+        # Quantity per product, so repeated lines reserve stock once
+        quantities = {}
+        for product_id, quantity in lines:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
 
-        for item in order_items:
-            OrderItem.objects.create(
-                order=order,
-                product=item['product'],
-                quantity=item['quantity'],
-                price=item['price']
-            )
+        # Generate unique order ID
+        order_id = f"ORD-{timezone.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
 
+        with transaction.atomic():
+            products = Product.objects.in_bulk(quantities.keys())
+            for product_id in quantities:
+                if product_id not in products:
+                    return Response(
+                        {'error': f'Product {product_id} not found'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+
+            short = [pid for pid, qty in quantities.items() if products[pid].stock < qty]
+            if short:
+                return insufficient_stock_response(short)
+
+            total = sum((products[pid].price * qty for pid, qty in lines), Decimal('0.00'))
+            order = Order.objects.create(
+                id=order_id,
+                user=user,
+                total=total,
+                payment_method=payment_method,
+                shipping_address=shipping_address,
+                delivery_method=delivery_method,
+                status='pending'
+            )
+            items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=products[pid], quantity=qty, price=products[pid].price)
+                for pid, qty in lines
+            ])
+            # Every checkout adds to the same per-day rollup rows, so they are
+            # updated after the commit instead of staying locked for the whole
+            # order (rebuild_sales_rollups repairs them if this is ever lost).
+            transaction.on_commit(lambda: rollups.record_order(order, items), robust=True)
+            # Stock is taken last with one conditional UPDATE, so the product rows
+            # stay locked only until the commit right after it. If a concurrent
+            # order got there first, the whole order is rolled back.
+            if not reservations.reserve(order, quantities):
+                transaction.set_rollback(True)
+                return insufficient_stock_response(list(quantities))
+            transaction.on_commit(lambda: metrics.record_order(order))
+
+        prefetch_related_objects([order], ORDER_ITEMS_PREFETCH)
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -205,8 +463,10 @@ class UserOrdersListAPIView(APIView):
     """
     GET /api/orders/user/<user_id>/
     Retrieve all orders for a specific user (auth required, user or admin).
+    Cursor-paginated, newest first; supports ?fields= and ?expand=.
     """
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = FAST_RENDERER_CLASSES
 
     def get(self, request, user_id):
         user = request.user
@@ -216,27 +476,30 @@ class UserOrdersListAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        orders = Order.objects.filter(user_id=user_id)
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        return paginated_orders_response(request, self, user_id=user_id)
 
 
 class OrderDetailAPIView(APIView):
     """
     GET /api/orders/<order_id>/
     Retrieve a specific order (auth required, owner or admin).
+    Supports ?fields= and ?expand= like the order history.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id)
-        if request.user.id != order.user.id and not request.user.is_admin:
+        selection, error = parse_field_selection(request.query_params, ORDER_SCHEMA, ORDER_EXPANDABLE)
+        if error:
+            return error
+
+        order = get_object_or_404(order_queryset(selection), id=order_id)
+        if request.user.id != order.user_id and not request.user.is_admin:
             return Response(
                 {'error': 'Permission denied'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        serializer = OrderSerializer(order)
+        serializer = OrderSerializer(order, context={'selection': selection})
         return Response(serializer.data)
 
 
@@ -249,17 +512,41 @@ class OrderUpdateStatusAPIView(APIView):
     permission_classes = [IsAdmin]
 
     def put(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id)
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': 'Request body must be a JSON object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        order = get_object_or_404(order_queryset(), id=order_id)
         new_status = request.data.get('status')
 
-        if new_status not in dict(Order.STATUS_CHOICES).keys():
+        if new_status not in [key for key, label in Order.STATUS_CHOICES]:
             return Response(
                 {'error': f'Invalid status. Choose from: {", ".join(dict(Order.STATUS_CHOICES).keys())}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        order.status = new_status
-        order.save()
+        old_status = order.status
+        error = reservations.status_change_error(old_status, new_status)
+        if error:
+            return Response({'error': error}, status=status.HTTP_409_CONFLICT)
+
+        with transaction.atomic():
+            # Only move the order from the status we read, so concurrent updates
+            # can't apply the same rollup change twice
+            changed = Order.objects.filter(pk=order.pk, status=old_status).update(
+                status=new_status, updated_at=timezone.now()
+            )
+            if not changed:
+                return Response(
+                    {'error': 'Order status was changed by another request, reload and try again'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            order.status = new_status
+            rollups.record_status_change(order, order.items.all(), old_status)
+            reservations.order_status_changed(order, old_status)
+
+        order.refresh_from_db(fields=['updated_at'])
         serializer = OrderSerializer(order)
         return Response(serializer.data)
 
@@ -268,13 +555,135 @@ class UserOrdersCurrentAPIView(APIView):
     """
     GET /api/users/orders/
     Retrieve all orders for the authenticated user (auth required).
+    Cursor-paginated, newest first; supports ?fields= and ?expand=.
     """
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = FAST_RENDERER_CLASSES
 
     def get(self, request):
-        orders = Order.objects.filter(user=request.user).order_by('-created_at')
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        return paginated_orders_response(request, self, user=request.user)
+
+
+def parse_date_range(params):
+    """
+    Read optional `start` and `end` dates (YYYY-MM-DD) from query params.
+    Returns ((start, end), error) where missing dates are None and error is a
+    Response to return to the client, or None.
+    """
+    try:
+        return tuple(
+            date.fromisoformat(params[name]) if params.get(name) else None for name in ('start', 'end')
+        ), None
+    except ValueError:
+        return (None, None), Response(
+            {'error': 'start and end must be dates in YYYY-MM-DD format'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+class OrderExportAPIView(APIView):
+    """
+    GET /api/orders/export/
+    Stream orders with their items for accounting (admin only).
+    Query params: output (csv|ndjson, default csv), start, end (YYYY-MM-DD, inclusive),
+    status (comma-separated). Orders are read in batches as the response is sent,
+    so memory use doesn't grow with the export size.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        params = request.query_params
+        export_format = params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Invalid output. Choose from: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        (start, end), error = parse_date_range(params)
+        if error:
+            return error
+        statuses = [value for value in params.get('status', '').split(',') if value]
+        invalid = [value for value in statuses if value not in dict(Order.STATUS_CHOICES)]
+        if invalid:
+            return Response(
+                {'error': f'Invalid status. Choose from: {", ".join(dict(Order.STATUS_CHOICES).keys())}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        orders = iter_orders(export_queryset(start, end, statuses))
+        response = StreamingHttpResponse(
+            streaming_content(request, export_lines(orders, export_format)),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        filename = f"orders-{start or 'all'}-{end or timezone.localdate()}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class SalesAnalyticsAPIView(APIView):
+    """
+    GET /api/analytics/sales/
+    Sales totals from the daily rollups in core.rollups (admin only).
+    Query params: start, end (YYYY-MM-DD, default: the last 30 days),
+    group_by (comma-separated from day, category, payment_method, status; default day),
+    category, payment_method, status (comma-separated filters; cancelled orders
+    are excluded unless status is given).
+    """
+    permission_classes = [IsAdmin]
+    GROUP_FIELDS = ['day', 'category', 'payment_method', 'status']
+
+    def get(self, request):
+        params = request.query_params
+        (start, end), error = parse_date_range(params)
+        if error:
+            return error
+        end = end or timezone.localdate()
+        start = start or end - timedelta(days=29)
+        if start > end:
+            return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = [field for field in params.get('group_by', '').split(',') if field] or ['day']
+        invalid = [field for field in group_by if field not in self.GROUP_FIELDS]
+        if invalid:
+            return Response(
+                {'error': f'Invalid group_by. Choose from: {", ".join(self.GROUP_FIELDS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = SalesRollup.objects.filter(day__range=(start, end))
+        categories = params.get('category')
+        if 'category' in group_by or categories:
+            rows = rows.exclude(category=rollups.ALL_CATEGORIES)
+        else:
+            rows = rows.filter(category=rollups.ALL_CATEGORIES)
+        if categories:
+            rows = rows.filter(category__in=categories.split(','))
+        if params.get('payment_method'):
+            rows = rows.filter(payment_method__in=params['payment_method'].split(','))
+        if params.get('status'):
+            rows = rows.filter(status__in=params['status'].split(','))
+        else:
+            rows = rows.exclude(status='cancelled')
+
+        results = list(
+            rows.values(*group_by)
+            .annotate(orders=Sum('order_count'), items=Sum('item_count'), revenue=Sum('revenue'))
+            .order_by(*group_by)
+        )
+        totals = {'orders': 0, 'items': 0, 'revenue': Decimal('0.00')}
+        for row in results:
+            for field in totals:
+                totals[field] += row[field]
+            row['revenue'] = str(row['revenue'].quantize(Decimal('0.01')))
+        totals['revenue'] = str(totals['revenue'].quantize(Decimal('0.01')))
+
+        return Response({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'results': results,
+            'totals': totals,
+        })
 
 
 class MessageCreateAPIView(APIView):
@@ -309,6 +718,7 @@ class UserMessagesListAPIView(APIView):
     """
     GET /api/messages/user/<user_id>/
     Retrieve all messages for a user (auth required, owner or admin).
+    Cursor-paginated, newest first.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -320,28 +730,206 @@ class UserMessagesListAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        messages = Message.objects.filter(user_id=user_id)
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        messages = Message.objects.filter(user_id=user_id).select_related('user')
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(messages, request, view=self)
+        serializer = MessageSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class AdminMessagesListAPIView(APIView):
     """
     GET /api/messages/admin/
-    Retrieve all unread messages (admin only).
+    Retrieve all customer messages above the admin read pointer of their
+    conversation (admin only). Cursor-paginated, newest first.
     """
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        messages = Message.objects.filter(read=False)
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        messages = Message.objects.filter(unread_filter('admin')).select_related('user')
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(messages, request, view=self)
+        serializer = MessageSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def put(self, request):
-        """Mark message as read."""
-        message_id = request.data.get('message_id')
+        """Mark a conversation read up to message_id on the admin side (same as POST /api/messages/read/)."""
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': 'Request body must be a JSON object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            message_id = int(request.data.get('message_id'))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'message_id must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         message = get_object_or_404(Message, id=message_id)
-        message.read = True
-        message.save()
+        mark_read(message.user_id, 'admin', up_to_id=message.id)
         serializer = MessageSerializer(message)
         return Response(serializer.data)
+
+
+class ConversationReadAPIView(APIView):
+    """
+    GET /api/messages/read/ - Read pointer and unread count of a conversation.
+    POST /api/messages/read/ - Mark a conversation read up to a message (one write).
+    Expects: {up_to_id (optional, defaults to the latest message)}
+    Customers act on their own conversation; admins pass user_id (query param
+    for GET, body for POST) and act on the admin side of that conversation.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def resolve_conversation(self, request, user_id):
+        """Return (user_id, side) or an error Response."""
+        if not request.user.is_admin:
+            return (request.user.id, 'user'), None
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None, Response(
+                {'error': 'user_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not User.objects.filter(pk=user_id).exists():
+            return None, Response(
+                {'error': 'User not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return (user_id, 'admin'), None
+
+    def state(self, user_id, side, pointer=None):
+        if pointer is None:
+            pointer = read_pointer(user_id, side)
+        return {
+            'user_id': user_id,
+            'side': side,
+            'last_read_message_id': pointer,
+            'unread_count': unread_count(user_id, side, pointer),
+        }
+
+    def get(self, request):
+        conversation, error = self.resolve_conversation(request, request.query_params.get('user_id'))
+        if error:
+            return error
+        return Response(self.state(*conversation))
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': 'Request body must be a JSON object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        conversation, error = self.resolve_conversation(request, request.data.get('user_id'))
+        if error:
+            return error
+
+        up_to_id = request.data.get('up_to_id')
+        if up_to_id is not None:
+            try:
+                # int() would accept true/false as 1/0
+                up_to_id = -1 if isinstance(up_to_id, bool) else int(up_to_id)
+            except (TypeError, ValueError):
+                up_to_id = -1
+            if up_to_id < 0:
+                return Response(
+                    {'error': 'up_to_id must be a non-negative integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        pointer = mark_read(*conversation, up_to_id=up_to_id)
+        return Response(self.state(*conversation, pointer=pointer))
+
+
+class AdminInboxAPIView(APIView):
+    """
+    GET /api/messages/admin/inbox/
+    One row per customer conversation (admin only): last message preview,
+    unread count and last activity, computed in a single grouped query.
+    Cursor-paginated, most recently active first.
+    """
+    permission_classes = [IsAdmin]
+    PREVIEW_LENGTH = 100
+
+    def get(self, request):
+        latest = Message.objects.filter(user=OuterRef('user_id')).order_by('-id')
+        conversations = Message.objects.values('user_id', 'user__email', 'user__username').annotate(
+            last_message_id=Max('id'),
+            last_activity=Max('created_at'),
+            unread_count=Count('id', filter=unread_filter('admin')),
+            message_count=Count('id'),
+            last_message_preview=Subquery(
+                latest.annotate(preview=Left('text', self.PREVIEW_LENGTH)).values('preview')[:1]
+            ),
+            last_message_sender=Subquery(latest.values('sender')[:1]),
+        )
+        paginator = InboxCursorPagination()
+        page = paginator.paginate_queryset(conversations, request, view=self)
+        serializer = ConversationSummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+def authenticate_stream_request(request):
+    """
+    Resolve the JWT user for a streaming request from the Authorization header
+    or ?token= (EventSource cannot send custom headers). Returns None if invalid.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('token', '').encode()
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def message_stream(request):
+    """
+    GET /api/messages/stream/
+    Server-Sent Events stream of new messages (auth required, run under ASGI).
+    Users receive their own conversation; admins receive every conversation,
+    or a single one with ?user_id=. After a reconnect the stream resumes after
+    the Last-Event-ID header (or ?last_id=); otherwise it starts with new messages.
+    """
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+    try:
+        if user.is_admin:
+            user_id = int(request.GET['user_id']) if request.GET.get('user_id') else None
+        else:
+            user_id = user.id
+        last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+        last_id = int(last_id) if last_id else await sync_to_async(latest_message_id)()
+    except ValueError:
+        return JsonResponse({'error': 'user_id and last_id must be integers'}, status=400)
+
+    response = StreamingHttpResponse(message_events(last_id, user_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    return response
+
+
+def metrics_view(request):
+    """
+    GET /metrics
+    Prometheus metrics for every worker process (see core.metrics). Requires
+    `Authorization: Bearer <METRICS_TOKEN>` when METRICS_TOKEN is set; without
+    a token the endpoint is only served in DEBUG.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not constant_time_compare(token, settings.METRICS_TOKEN):
+            return JsonResponse({'error': 'Invalid metrics token'}, status=401)
+    elif not settings.DEBUG:
+        return JsonResponse({'error': 'Set METRICS_TOKEN to enable /metrics'}, status=403)
+
+    body, content_type = metrics.render_latest()
+    return HttpResponse(body, content_type=content_type)
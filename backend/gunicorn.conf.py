@@ -0,0 +1,31 @@
+"""
+Gunicorn settings shared by the Procfile and the Dockerfile, which both run the
+ASGI application on uvicorn workers so message streams don't tie up a worker.
+
+Each worker process keeps its own Prometheus metrics, so PROMETHEUS_MULTIPROC_DIR
+must name a directory shared by all workers before the app is imported (see
+core.metrics). The master empties it at startup and drops a worker's live
+gauges when that worker exits; its counters and histograms stay in the totals.
+"""
+import os
+import shutil
+import tempfile
+
+# Must be set before prometheus_client is first imported, here and in the workers
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'altruria-prometheus'))
+
+from prometheus_client import multiprocess  # noqa: E402
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+errorlog = '-'
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to the new totals
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
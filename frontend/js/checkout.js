@@ -114,7 +114,7 @@ function prefillCheckoutForm(user) {
 /**
  * Load products from backend API to get product details and images
  */
-// Fetch product details for all items in cart by ID, map fields, and store in window._products
+// Price the whole cart with one POST /api/cart/quote/ call, map fields, and store in window._products
 // Image paths: '../images/' from pages/ folder → resolves to /frontend/images/
 // Fallback: default-product.png (copied to /frontend/images/ for missing product images)
 async function loadProducts() {
@@ -125,30 +125,43 @@ async function loadProducts() {
         }
         // Get unique product IDs from cart
         const ids = [...new Set(window.cart.map(item => item.productId))];
+        const unknown = (id) => ({ id, name: 'Unknown Product', price: 0, image: '../images/default-product.png', _error: true });
+
+        const resp = await fetch(`${API_BASE}/api/cart/quote/`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                items: window.cart.map(item => ({ product_id: item.productId, quantity: item.quantity || 1 }))
+            })
+        });
+        if (!resp.ok) {
+            console.error(`❌ Cart quote failed: status ${resp.status}`);
+            // Fallback to default-product.png if API fetch fails
+            window._products = ids.map(unknown);
+            return;
+        }
+
+        const quote = await resp.json();
         const products = [];
-        for (const id of ids) {
-            try {
-                const resp = await fetch(`${API_BASE}/api/products/${id}/`);
-                if (!resp.ok) {
-                    console.error(`❌ Product fetch failed for ID ${id}: status ${resp.status}`);
-                    // Fallback to default-product.png if API fetch fails
-                    products.push({ id, name: 'Unknown Product', price: 0, image: '../images/default-product.png', _error: true });
-                    continue;
-                }
-                const prod = await resp.json();
-                // Map backend fields to frontend expected fields
-                // Image path from API is used if available; fallback to default-product.png
-                products.push({
-                    id: prod.id,
-                    name: prod.name || prod.title || 'Unknown Product',
-                    price: parseFloat(prod.price || prod.unit_price || 0),
-                    image: prod.image || prod.photo || '../images/default-product.png', // Fallback: /frontend/images/default-product.png
-                    ...prod
-                });
-            } catch (err) {
-                console.error(`❌ Error fetching product ID ${id}:`, err);
-                products.push({ id, name: 'Unknown Product', price: 0, image: '../images/default-product.png', _error: true });
-            }
+        const seen = new Set();
+        for (const line of quote.items || []) {
+            if (seen.has(line.product_id)) continue;
+            seen.add(line.product_id);
+            const prod = line.product || {};
+            // Map backend fields to frontend expected fields
+            // Image path from API is used if available; fallback to default-product.png
+            products.push({
+                ...prod,
+                id: line.product_id,
+                name: prod.name || 'Unknown Product',
+                price: parseFloat(line.unit_price || prod.price || 0),
+                image: prod.image || '../images/default-product.png', // Fallback: /frontend/images/default-product.png
+                available: line.available
+            });
+        }
+        for (const id of quote.missing || []) {
+            console.error(`❌ Product ${id} no longer exists`);
+            if (!seen.has(id)) products.push(unknown(id));
         }
         window._products = products;
         console.log('✅ Products loaded:', window._products);
@@ -276,6 +289,24 @@ function showToast(message, type = 'info') {
     }, 3000);
 }
 
+/**
+ * Idempotency-Key for the order being submitted. Resubmitting the same order after
+ * a timeout or network error reuses it, so the backend returns the order it already
+ * placed instead of placing a second one.
+ */
+let pendingOrderKey = null;
+let pendingOrderBody = null;
+
+function orderIdempotencyKey(body) {
+    if (!pendingOrderKey || pendingOrderBody !== body) {
+        pendingOrderKey = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+        pendingOrderBody = body;
+    }
+    return pendingOrderKey;
+}
+
 /**
  * Setup form event listeners
  */
@@ -433,23 +464,26 @@ function setupFormListeners() {
                 return;
             }
 
+            const orderBody = JSON.stringify(orderPayload);
             const response = await fetch(`${API_BASE}/api/orders/`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'Authorization': `Bearer ${token}`
+                    'Authorization': `Bearer ${token}`,
+                    'Idempotency-Key': orderIdempotencyKey(orderBody)
                 },
-                body: JSON.stringify(orderPayload)
+                body: orderBody
             });
 
             if (!response.ok) {
                 const errorData = await response.json();
                 console.error('❌ Backend error:', errorData);
-                showToast('Error placing order: ' + (errorData.detail || 'Unknown error'), 'error');
+                showToast('Error placing order: ' + (errorData.error || errorData.detail || 'Unknown error'), 'error');
                 return;
             }
 
             const backendOrder = await response.json();
+            pendingOrderKey = null;
             console.log('✅ Order created successfully:', backendOrder);
 
             // Clear cart from localStorage and memory immediately
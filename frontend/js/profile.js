@@ -278,13 +278,17 @@ async function handleProfileUpdate(e) {
 // ============================================================================
 // ORDER HISTORY LOADING & DISPLAY
 // ============================================================================
-async function loadUserOrders() {
+// Orders loaded so far and the cursor URL of the next page (null when exhausted)
+let loadedOrders = [];
+let ordersNextUrl = null;
+
+async function loadUserOrders(pageUrl = null) {
     try {
         console.log('[PROFILE] Fetching user orders...');
         const token = localStorage.getItem('access_token');
         
-        // Try to fetch orders from the user's orders endpoint
-        const response = await fetch(`${API_URL}/users/orders/`, {
+        // Try to fetch orders from the user's orders endpoint (cursor-paginated, newest first)
+        const response = await fetch(pageUrl || `${API_URL}/users/orders/`, {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -293,7 +297,10 @@ async function loadUserOrders() {
         let orders = [];
 
         if (response.ok) {
-            orders = await response.json();
+            const page = await response.json();
+            ordersNextUrl = page.next || null;
+            loadedOrders = pageUrl ? loadedOrders.concat(page.results || []) : (page.results || []);
+            orders = loadedOrders;
         } else if (response.status === 404) {
             console.log('[PROFILE] Orders endpoint not found, will show empty state');
             orders = [];
@@ -373,6 +380,18 @@ function renderOrderHistory(orders) {
     // Render all orders initially
     renderOrderCards(orders, ordersList);
 
+    // Older orders are fetched one cursor page at a time
+    if (ordersNextUrl) {
+        const loadMoreBtn = document.createElement('button');
+        loadMoreBtn.className = 'btn-load-more';
+        loadMoreBtn.textContent = 'Load older orders';
+        loadMoreBtn.addEventListener('click', () => {
+            loadMoreBtn.disabled = true;
+            loadUserOrders(ordersNextUrl);
+        });
+        container.appendChild(loadMoreBtn);
+    }
+
     // Setup filter functionality
     const filterBtns = filterButtons.querySelectorAll('.filter-btn');
     filterBtns.forEach(btn => {
@@ -586,21 +605,29 @@ async function loadUserMessages() {
         messagesList.innerHTML = '<div class="loading-spinner"><i class="fas fa-spinner fa-spin"></i> Loading messages...</div>';
 
         const token = localStorage.getItem('access_token');
-        const response = await fetch(`${API_URL}/messages/user/${currentUser.id}/`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const headers = { 'Authorization': `Bearer ${token}` };
+        const [response, readResponse] = await Promise.all([
+            fetch(`${API_URL}/messages/user/${currentUser.id}/`, { headers }),
+            fetch(`${API_URL}/messages/read/`, { headers })
+        ]);
 
         if (!response.ok) {
             throw new Error(`Failed to load messages: ${response.status}`);
         }
+        if (readResponse.ok) {
+            readPointer = (await readResponse.json()).last_read_message_id;
+        }
 
-        const messages = await response.json();
+        // Cursor-paginated response: the first page holds the newest messages
+        const page = await response.json();
+        const messages = page.results || [];
         console.log('[MESSAGES] Loaded messages:', messages.length);
 
+        currentMessages = messages;
         renderMessages(messages);
         updateUnreadCount(messages);
+        connectMessageStream();
+        markConversationRead(messages);
     } catch (error) {
         console.error('[MESSAGES] Error loading messages:', error);
         document.getElementById('messages-list').innerHTML = `
@@ -612,6 +639,74 @@ async function loadUserMessages() {
     }
 }
 
+/**
+ * Admin replies above the conversation's read pointer are unread.
+ */
+function isUnread(msg) {
+    return msg.sender === 'admin' && msg.id > readPointer;
+}
+
+/**
+ * Mark every admin reply up to the newest loaded message as read with a single
+ * request (the server stores a read pointer for the conversation).
+ */
+async function markConversationRead(messages) {
+    if (!messages.some(isUnread)) return;
+    try {
+        const token = localStorage.getItem('access_token');
+        const response = await fetch(`${API_URL}/messages/read/`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ up_to_id: Math.max(...messages.map(msg => msg.id)) })
+        });
+        if (!response.ok) {
+            throw new Error(`Failed to mark messages read: ${response.status}`);
+        }
+        readPointer = (await response.json()).last_read_message_id;
+        updateUnreadCount(currentMessages);
+    } catch (error) {
+        console.warn('[MESSAGES] Could not mark messages read:', error);
+    }
+}
+
+// Messages currently shown, the id of the last admin reply read, and the live update stream
+let currentMessages = [];
+let readPointer = 0;
+let messageStream = null;
+
+/**
+ * Subscribe to new messages over Server-Sent Events instead of re-fetching the
+ * whole history. The browser reconnects on its own and resumes after the last
+ * received message (Last-Event-ID).
+ */
+function connectMessageStream() {
+    if (!window.EventSource || messageStream) return;
+    const token = localStorage.getItem('access_token');
+    if (!token) return;
+
+    const lastId = currentMessages.reduce((max, msg) => Math.max(max, msg.id), 0);
+    messageStream = new EventSource(`${API_URL}/messages/stream/?token=${encodeURIComponent(token)}&last_id=${lastId}`);
+
+    messageStream.addEventListener('message', (event) => {
+        const msg = JSON.parse(event.data);
+        if (currentMessages.some(m => m.id === msg.id)) return;
+        currentMessages = [msg, ...currentMessages];
+        renderMessages(currentMessages);
+        updateUnreadCount(currentMessages);
+    });
+
+    messageStream.onerror = () => {
+        // A rejected (e.g. expired) token closes the stream for good: reopen with the current token
+        if (messageStream.readyState === EventSource.CLOSED) {
+            messageStream = null;
+            setTimeout(connectMessageStream, 5000);
+        }
+    };
+}
+
 function renderMessages(messages) {
     const messagesList = document.getElementById('messages-list');
     
@@ -637,7 +732,7 @@ function renderMessages(messages) {
         });
 
         return `
-            <div class="message-card ${isFromUser ? 'message-user' : 'message-admin'} ${msg.read ? 'read' : 'unread'}">
+            <div class="message-card ${isFromUser ? 'message-user' : 'message-admin'} ${isUnread(msg) ? 'unread' : 'read'}">
                 <div class="message-header">
                     <div class="message-sender">
                         <i class="fas fa-${isFromUser ? 'user' : 'user-shield'}"></i>
@@ -648,7 +743,7 @@ function renderMessages(messages) {
                 <div class="message-body">
                     ${escapeHtml(msg.text)}
                 </div>
-                ${!msg.read && !isFromUser ? '<span class="unread-indicator">New</span>' : ''}
+                ${isUnread(msg) ? '<span class="unread-indicator">New</span>' : ''}
             </div>
         `;
     }).join('');
@@ -657,7 +752,7 @@ function renderMessages(messages) {
 }
 
 function updateUnreadCount(messages) {
-    const unreadMessages = messages.filter(msg => !msg.read && msg.sender === 'admin');
+    const unreadMessages = messages.filter(isUnread);
     const unreadCount = document.getElementById('unread-count');
     
     if (unreadCount) {
@@ -146,6 +146,10 @@ function createProductCard(p) {
   }
 
   const img = p.image ? p.image : '../images/poster.png';
+  // Resized WebP variants from the API; the browser picks the smallest that fits the card
+  const srcset = p.image_srcset && p.image_srcset.webp
+    ? ` srcset="${p.image_srcset.webp}" sizes="(max-width: 600px) 100vw, 320px"`
+    : '';
   const desc = p.description ? escapeHtml(p.description) : 'Quality farm product';
   const stock = p.stock != null ? p.stock : '∞';
   const priceNum = safeNumber(p.price, 0);
@@ -156,7 +160,7 @@ function createProductCard(p) {
   return `
     <article class="product-card">
       <!-- Image path: from API or fallback to poster.png in /frontend/images/ -->
-      <img class="product-image" src="${img}" alt="${name}" onerror="this.src='../images/poster.png'">
+      <img class="product-image" src="${img}"${srcset} alt="${name}" loading="lazy" onerror="this.removeAttribute('srcset'); this.src='../images/poster.png'">
       <div class="product-info">
         <h3>${name}</h3>
         <p>${desc}</p>